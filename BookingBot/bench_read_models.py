@@ -0,0 +1,122 @@
+"""
+Бенчмарк стоимости строки: ORM-сущности против моделей чтения (выборка колонок).
+Для каждого пути чтения сравнивает время на строку и пиковую память (tracemalloc)
+на временной SQLite базе:
+    python bench_read_models.py --bookings 50000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time as timer
+import tracemalloc
+from datetime import date, time, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from database.database import Base
+from database.models import Booking, Organization, User
+from utils.booking_service import get_organization_bookings, get_organization_users, get_user_bookings
+
+ORGANIZATION_ID = 1
+USER_ID = 1
+
+
+async def populate(session_factory, bookings: int, users: int):
+    async with session_factory() as db:
+        db.add(Organization(id=ORGANIZATION_ID, name="Организация", admin_telegram_id=1, unique_code="bench"))
+        await db.flush()
+        await db.execute(insert(User), [
+            {"telegram_id": number, "full_name": f"Клиент {number}", "username": f"user{number}",
+             "organization_id": ORGANIZATION_ID, "role": "client"}
+            for number in range(1, users + 1)
+        ])
+        await db.execute(insert(Booking), [
+            {"organization_id": ORGANIZATION_ID, "telegram_user_id": USER_ID if number % 2 else number,
+             "user_full_name": f"Клиент {number}", "booking_date": date(2024, 1, 1) + timedelta(days=number // 10),
+             "start_time": time(8 + number % 10), "end_time": time(9 + number % 10), "booking_status": "active"}
+            for number in range(bookings)
+        ])
+        await db.commit()
+
+
+def orm_paths():
+    """Прежние реализации: целые сущности"""
+    async def organization_bookings(db):
+        result = await db.execute(select(Booking).where(
+            Booking.organization_id == ORGANIZATION_ID, Booking.booking_status == "active"
+        ).order_by(Booking.booking_date, Booking.start_time))
+        return result.scalars().all()
+
+    async def user_bookings(db):
+        result = await db.execute(select(Booking).where(
+            Booking.telegram_user_id == USER_ID, Booking.booking_status == "active"
+        ).order_by(Booking.booking_date, Booking.start_time))
+        return result.scalars().all()
+
+    async def organization_users(db):
+        result = await db.execute(select(User).where(User.organization_id == ORGANIZATION_ID))
+        return result.scalars().all()
+
+    return {
+        "organization_bookings": organization_bookings,
+        "user_bookings": user_bookings,
+        "organization_users": organization_users,
+    }
+
+
+def view_paths():
+    return {
+        "organization_bookings": lambda db: get_organization_bookings(db, ORGANIZATION_ID),
+        "user_bookings": lambda db: get_user_bookings(db, USER_ID),
+        "organization_users": lambda db: get_organization_users(db, ORGANIZATION_ID),
+    }
+
+
+async def measure(session_factory, read, repeat: int):
+    """Возвращает: (число строк, мкс на строку, пик памяти в КБ)"""
+    rows = 0
+    elapsed = 0.0
+    for _ in range(repeat):
+        # Новая сессия на каждый прогон - как сессия на апдейт в боте
+        async with session_factory() as db:
+            started = timer.perf_counter()
+            rows = len(await read(db))
+            elapsed += timer.perf_counter() - started
+    # Память - отдельным прогоном: tracemalloc сильно замедляет выполнение
+    async with session_factory() as db:
+        tracemalloc.start()
+        await read(db)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return rows, elapsed / repeat / max(rows, 1) * 1e6, peak / 1024
+
+
+async def run(bookings: int, users: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await populate(session_factory, bookings, users)
+
+        print(f"{'путь':<24}{'строк':>8}{'ORM, мкс/стр':>15}{'кортежи, мкс/стр':>19}{'ORM, КБ':>10}{'кортежи, КБ':>13}")
+        orm, views = orm_paths(), view_paths()
+        for name in orm:
+            rows, orm_cost, orm_peak = await measure(session_factory, orm[name], repeat)
+            _, view_cost, view_peak = await measure(session_factory, views[name], repeat)
+            print(f"{name:<24}{rows:>8}{orm_cost:>15.2f}{view_cost:>19.2f}{orm_peak:>10.0f}{view_peak:>13.0f}")
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.bookings, args.users, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
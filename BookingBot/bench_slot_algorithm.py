@@ -0,0 +1,260 @@
+"""
+Бенчмарк алгоритма "без окон" (utils.slot_engine) по размерам дня и вместимости.
+Перебирает число слотов (8-96), max_sessions (1-12), длительность сеанса и расположение
+броней; для каждого случая измеряет операции в секунду (лучший из --repeat прогонов)
+и пиковую память одного вызова (tracemalloc, отдельным прогоном).
+Вперемежку с каждым случаем измеряется эталонная нагрузка на интерпретатор; регрессии
+ищутся по скорости относительно неё (relative_speed), поэтому колебания частоты и фоновая
+нагрузка машины почти не влияют на сравнение.
+Результаты сравниваются с сохранённым базовым замером; при замедлении больше --tolerance
+или росте памяти больше --memory-tolerance скрипт завершается с кодом 1:
+    python bench_slot_algorithm.py --output results.json
+    python bench_slot_algorithm.py --update-baseline      # после намеренных изменений
+    python bench_slot_algorithm.py --filter get_available_slots_for_day
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time as timer
+import tracemalloc
+from datetime import datetime, time
+from math import comb
+from statistics import median
+from utils.slot_engine import (
+    generate_time_slots, get_available_slots_for_day, get_available_slots_no_windows, get_valid_combinations
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_slot_algorithm_baseline.json")
+
+SLOT_COUNTS = (8, 16, 32, 64, 96)
+MAX_SESSIONS = (1, 3, 6, 12)
+DURATIONS = (10, 30, 60)
+PATTERNS = ("empty", "block", "scattered", "full")
+# Переборный get_valid_combinations измеряется, только пока число комбинаций обозримо
+MAX_COMBINATIONS = 5000
+# Запас к допуску по памяти: пики в несколько сотен байт заметно колеблются
+MEMORY_SLACK_BYTES = 1024
+
+
+def booked_ordinals(pattern: str, slots: int, max_sessions: int):
+    """Порядковые номера занятых слотов для шаблона расположения броней"""
+    if pattern == "empty":
+        return []
+    if pattern == "block":
+        # Непрерывный блок в середине дня, вместимость заполнена наполовину
+        count = min(max_sessions // 2, slots)
+        first = (slots - count) // 2
+        return list(range(first, first + count))
+    if pattern == "scattered":
+        # Брони через два слота: внутри блока остаются пропуски
+        return list(range(1, slots, 3))[:max_sessions // 2]
+    if pattern == "full":
+        return list(range(min(max_sessions, slots)))
+    raise ValueError(f"Неизвестный шаблон броней: {pattern}")
+
+
+def cases():
+    """(ключ, функция без аргументов) для всех случаев перебора"""
+    for duration in DURATIONS:
+        for slots in SLOT_COUNTS:
+            minutes = slots * duration
+            if minutes >= 24 * 60:
+                continue  # день не помещается в сутки
+            start, end = time(0, 0), time(minutes // 60, minutes % 60)
+            day_slots = generate_time_slots(start, end, duration)
+            prefix = f"duration={duration}/slots={slots}"
+            yield (f"generate_time_slots/{prefix}",
+                   lambda start=start, end=end, duration=duration: generate_time_slots(start, end, duration))
+            for max_sessions in MAX_SESSIONS:
+                for pattern in PATTERNS:
+                    booked = [day_slots[index] for index in booked_ordinals(pattern, slots, max_sessions)]
+                    key = f"{prefix}/max_sessions={max_sessions}/{pattern}"
+                    yield (f"get_available_slots_no_windows/{key}",
+                           lambda s=day_slots, m=max_sessions, b=booked: get_available_slots_no_windows(s, m, b))
+                    yield (f"get_available_slots_for_day/{key}",
+                           lambda s=start, e=end, m=max_sessions, d=duration, b=booked:
+                           get_available_slots_for_day(s, e, m, d, b))
+                    free = slots - len(booked)
+                    combinations = sum(comb(free, r) for r in range(1, max_sessions - len(booked) + 1))
+                    if combinations <= MAX_COMBINATIONS:
+                        yield (f"get_valid_combinations/{key}",
+                               lambda s=day_slots, m=max_sessions, b=booked: get_valid_combinations(s, m, b))
+
+
+def reference_workload():
+    """Эталонная нагрузка: типичные для алгоритма операции над списками и целыми"""
+    values = [index * 7919 % 1009 for index in range(200)]
+    return sorted(values), sum(value & -value for value in values)
+
+
+def _loops_for(func, min_time: float) -> int:
+    """Число повторов, при котором прогон длится не меньше min_time"""
+    loops = 1
+    while True:
+        started = timer.perf_counter()
+        for _ in range(loops):
+            func()
+        if timer.perf_counter() - started >= min_time:
+            return loops
+        loops *= 2
+
+
+def _best_time(func, loops: int, best: float) -> float:
+    started = timer.perf_counter()
+    for _ in range(loops):
+        func()
+    return min(best, timer.perf_counter() - started)
+
+
+def measure(func, min_time: float, repeat: int, reference_loops: int):
+    """Возвращает: (операций в секунду, скорость относительно эталона, пик памяти вызова в байтах)"""
+    loops = _loops_for(func, min_time)
+    best = reference_best = float("inf")
+    # Как в timeit: сборщик мусора не должен вмешиваться в замер
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            # Эталон и случай чередуются, чтобы попадать в одни и те же условия машины
+            reference_best = _best_time(reference_workload, reference_loops, reference_best)
+            best = _best_time(func, loops, best)
+    finally:
+        gc.enable()
+    ops_per_sec = loops / best
+    # Память - отдельным прогоном: tracemalloc сильно замедляет выполнение
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return ops_per_sec, ops_per_sec / (reference_loops / reference_best), peak
+
+
+def run(name_filter: str, min_time: float, repeat: int, keys=None):
+    reference_loops = _loops_for(reference_workload, min_time / 2)
+    results = {}
+    for key, func in cases():
+        if name_filter and name_filter not in key or keys is not None and key not in keys:
+            continue
+        ops_per_sec, relative_speed, peak = measure(func, min_time, repeat, reference_loops)
+        results[key] = {"ops_per_sec": round(ops_per_sec, 1), "relative_speed": round(relative_speed, 6),
+                        "peak_bytes": peak}
+        print(f"{key:<82}{ops_per_sec:>14,.0f} оп/с{relative_speed:>12.4f}{peak:>10} Б")
+    return results
+
+
+def remeasure(results, keys, min_time: float, repeat: int):
+    """
+    Повторно измеряет случаи с подозрением на регрессию и оставляет лучший из двух замеров:
+    единичный всплеск нагрузки на машине не должен валить проверку
+    """
+    print(f"\nПовторный замер случаев с подозрением на регрессию ({len(keys)}):")
+    for key, again in run("", min_time, repeat * 2, set(keys)).items():
+        previous = results[key]
+        results[key] = again if again["relative_speed"] > previous["relative_speed"] else dict(previous)
+        results[key]["peak_bytes"] = min(previous["peak_bytes"], again["peak_bytes"])
+
+
+def median_results(rounds):
+    """Медиана нескольких полных прогонов: базовый замер не должен зависеть от удачного прогона"""
+    results = {}
+    for key in rounds[0]:
+        samples = [round_results[key] for round_results in rounds]
+        results[key] = {
+            "ops_per_sec": round(median(sample["ops_per_sec"] for sample in samples), 1),
+            "relative_speed": round(median(sample["relative_speed"] for sample in samples), 6),
+            "peak_bytes": max(sample["peak_bytes"] for sample in samples),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance: float, memory_tolerance: float):
+    """Список регрессий относительно базового замера (случаи без базы пропускаются)"""
+    regressions = []
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        if current["relative_speed"] < reference["relative_speed"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: относительная скорость {current['relative_speed']:.4f} "
+                f"против {reference['relative_speed']:.4f} в базе ({current['ops_per_sec']:,.0f} оп/с)"
+            )
+        if current["peak_bytes"] > reference["peak_bytes"] * (1 + memory_tolerance) + MEMORY_SLACK_BYTES:
+            regressions.append(f"{key}: {current['peak_bytes']} Б против {reference['peak_bytes']} Б в базе")
+    return regressions
+
+
+def report_document(results):
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def write_json(path: str, document):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="базовый замер для сравнения")
+    parser.add_argument("--update-baseline", action="store_true", help="сохранить результаты как базовый замер")
+    parser.add_argument("--rounds", type=int, default=3, help="число прогонов для медианы базового замера")
+    parser.add_argument("--filter", default="", help="измерять только случаи, ключ которых содержит строку")
+    parser.add_argument("--min-time", type=float, default=0.02, help="минимальная длительность прогона, сек")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимое замедление (доля)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="допустимый рост памяти (доля)")
+    args = parser.parse_args()
+
+    if args.update_baseline:
+        results = median_results([run(args.filter, args.min_time, args.repeat) for _ in range(max(1, args.rounds))])
+    else:
+        results = run(args.filter, args.min_time, args.repeat)
+    baseline = None
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        suspects = [line.split(":", 1)[0] for line in
+                    compare(results, baseline, args.tolerance, args.memory_tolerance)]
+        if suspects:
+            remeasure(results, list(dict.fromkeys(suspects)), args.min_time, args.repeat)
+    if args.output:
+        write_json(args.output, report_document(results))
+        print(f"\nРезультаты записаны в {args.output}")
+
+    if args.update_baseline:
+        baseline = {}
+        if args.filter and os.path.exists(args.baseline):
+            # Частичный прогон обновляет только измеренные случаи
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)
+        write_json(args.baseline, report_document(baseline))
+        print(f"Базовый замер обновлён: {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"Базовый замер {args.baseline} не найден, сравнение пропущено")
+        return
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"\nРегрессии относительно базового замера ({len(regressions)}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"\nРегрессий относительно базового замера нет ({len(results)} случаев)")
+
+
+if __name__ == "__main__":
+    main()
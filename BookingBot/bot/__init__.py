@@ -1,5 +1,6 @@
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from database.database import FsmSessionLocal
+from utils.fsm_storage import create_fsm_storage
 import os
 
 # Токен бота из переменной окружения
@@ -9,6 +10,6 @@ if not BOT_TOKEN:
     raise ValueError("Необходимо установить BOT_TOKEN в переменных окружения")
 
 # Инициализация бота и диспетчера
-storage = MemoryStorage()
+storage = create_fsm_storage(FsmSessionLocal)
 dp = Dispatcher(storage=storage)
 bot = Bot(token=BOT_TOKEN)
\ No newline at end of file
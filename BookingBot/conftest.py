@@ -0,0 +1,35 @@
+"""Общая обвязка тестов: сценарий на временной базе SQLite со схемой бота"""
+import asyncio
+from typing import Optional
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from database.database import Base, EngineSettings, create_engine_from_settings
+import database.models  # noqa: F401
+
+
+@pytest.fixture
+def run_with_database(tmp_path):
+    """
+    run_with_database(flow, *args, name=..., settings=...) выполняет flow(engine, session_factory, *args)
+    в asyncio.run на новой базе и возвращает его результат.
+    name=None - база в памяти, иначе файл в каталоге теста; settings - движок как в боте
+    (create_engine_from_settings), без них - движок aiosqlite по умолчанию.
+    Таблицы создаются до сценария, движок закрывается после него в любом случае
+    """
+
+    def run(flow, *args, name: Optional[str] = "test.db", settings: Optional[EngineSettings] = None):
+        async def main():
+            url = f"sqlite+aiosqlite:///{tmp_path / name}" if name else "sqlite+aiosqlite://"
+            engine = create_engine_from_settings(url, settings) if settings else create_async_engine(url)
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+                return await flow(engine, session_factory, *args)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
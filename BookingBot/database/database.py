@@ -1,26 +1,190 @@
 import os
+from typing import NamedTuple, Optional, Union
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy import text
-from database.models import Schedule, SpecificDate, Booking, User, Setting
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 load_dotenv()
 
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite+aiosqlite:///./booking_bot.db')
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+class EngineSettings(NamedTuple):
+    """Параметры движка и пула соединений"""
+    echo: Union[bool, str] = False  # True - логировать SQL, "debug" - ещё и результаты
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: float = 30  # ожидание свободного соединения, сек
+    pool_recycle: int = 1800  # пересоздание соединений старше N секунд
+    pool_pre_ping: bool = True
+    command_timeout: Optional[float] = None  # таймаут запроса asyncpg, сек
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+
+
+# Профили по умолчанию; отдельные параметры переопределяются переменными окружения DB_*
+ENGINE_PROFILES = {
+    "dev": EngineSettings(echo=True, pool_size=5, max_overflow=5, pool_recycle=-1, pool_pre_ping=False),
+    "prod": EngineSettings(),
+}
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _parse_echo(value: str) -> Union[bool, str]:
+    return "debug" if value.strip().lower() == "debug" else _parse_bool(value)
+
+
+_ENV_OVERRIDES = {
+    "DB_ECHO": ("echo", _parse_echo),
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_POOL_PRE_PING": ("pool_pre_ping", _parse_bool),
+    "DB_COMMAND_TIMEOUT": ("command_timeout", float),
+    "SQLITE_JOURNAL_MODE": ("sqlite_journal_mode", str),
+    "SQLITE_SYNCHRONOUS": ("sqlite_synchronous", str),
+    "SQLITE_BUSY_TIMEOUT_MS": ("sqlite_busy_timeout_ms", int),
+}
+
+
+def load_engine_settings(profile: str = None, environ=None) -> EngineSettings:
+    """Настройки движка: профиль DB_PROFILE (dev/prod) и переопределения из окружения"""
+    if environ is None:
+        environ = os.environ
+    if profile is None:
+        profile = environ.get('DB_PROFILE', 'prod')
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Неизвестный профиль базы данных: {profile}")
+    overrides = {}
+    for variable, (field, parse) in _ENV_OVERRIDES.items():
+        if environ.get(variable):
+            overrides[field] = parse(environ[variable])
+    return ENGINE_PROFILES[profile]._replace(**overrides)
+
+
+def _set_sqlite_pragmas(settings: EngineSettings):
+    def on_connect(dbapi_connection, connection_record):
+        # Транзакциями управляет SQLAlchemy (см. _begin_sqlite_transaction), а не драйвер:
+        # иначе SAVEPOINT вне BEGIN фиксируется сам и откат внешней транзакции его не отменяет
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.close()
+    return on_connect
+
+
+def _begin_sqlite_transaction(connection):
+    # sqlite_begin="IMMEDIATE" в execution options: транзакция сразу берёт блокировку записи
+    # и ждёт её по busy_timeout, а не падает с "database is locked" на первой записи после чтения
+    mode = connection.get_execution_options().get("sqlite_begin")
+    connection.exec_driver_sql(f"BEGIN {mode}" if mode else "BEGIN")
+
+
+def is_sqlite_in_memory(url: str) -> bool:
+    database_url = make_url(url)
+    return database_url.get_backend_name() == "sqlite" and database_url.database in (None, "", ":memory:")
+
+
+def create_engine_from_settings(url: str, settings: EngineSettings) -> AsyncEngine:
+    """Создаёт асинхронный движок с настройками пула и прагмами SQLite"""
+    database_url = make_url(url)
+    options = {"echo": settings.echo}
+    is_sqlite = database_url.get_backend_name() == "sqlite"
+    in_memory = is_sqlite_in_memory(url)
+    if not in_memory:
+        # Для SQLite в памяти используется StaticPool без настроек размера пула
+        options.update(
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pool_pre_ping,
+        )
+    if is_sqlite and not in_memory:
+        # По умолчанию aiosqlite открывает новое соединение (и заново выполняет прагмы) на каждую сессию
+        options["poolclass"] = AsyncAdaptedQueuePool
+    if settings.command_timeout and database_url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"command_timeout": settings.command_timeout}
+
+    async_engine = create_async_engine(url, **options)
+    if is_sqlite:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas(settings))
+        event.listen(async_engine.sync_engine, "begin", _begin_sqlite_transaction)
+    return async_engine
+
+
+engine = create_engine_from_settings(DATABASE_URL, load_engine_settings())
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+# Отдельный небольшой пул для хранилища FSM: хендлер держит соединение сессии апдейта
+# и одновременно пишет состояние; из общего пула при нехватке соединений это взаимная
+# блокировка до pool_timeout. SQLite в памяти - отдельная база на движок, поэтому пул общий.
+# Файловой SQLite отдельный пул не помогает: писатель в ней один, и под нагрузкой
+# запросы упираются в "database is locked" при любом числе пулов
+if is_sqlite_in_memory(DATABASE_URL):
+    fsm_engine = engine
+else:
+    fsm_engine = create_engine_from_settings(DATABASE_URL, load_engine_settings()._replace(
+        pool_size=int(os.getenv('FSM_DB_POOL_SIZE', '5')),
+        max_overflow=int(os.getenv('FSM_DB_MAX_OVERFLOW', '10'))
+    ))
+FsmSessionLocal = sessionmaker(fsm_engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
 
+async def dispose_engines():
+    """Закрывает соединения обоих пулов (при остановке бота)"""
+    if fsm_engine is not engine:
+        await fsm_engine.dispose()
+    await engine.dispose()
+
+
 async def init_db():
     """Инициализация базы данных и создание таблиц"""
+    # Импорт моделей регистрирует таблицы в Base.metadata
+    import database.models  # noqa: F401
+    from database.migrations import ensure_indexes
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(ensure_indexes)
     
     # Проверка подключения
     async with engine.begin() as conn:
         await conn.execute(text("SELECT 1"))
     
-    print("База данных инициализирована")
\ No newline at end of file
+    print("База данных инициализирована")
+
+
+def is_managed(db: AsyncSession) -> bool:
+    """Сессией управляет DbSessionMiddleware: фиксирует транзакцию она сама, один раз за апдейт"""
+    return db.info.get("managed", False)
+
+
+async def commit_or_flush(db: AsyncSession):
+    """Фиксирует изменения; в управляемой сессии только отправляет их в БД (flush)"""
+    if is_managed(db):
+        await db.flush()
+    else:
+        await db.commit()
+
+
+def after_commit(db: AsyncSession, callback):
+    """
+    Вызывает callback после фиксации транзакции: сразу, если сессия не управляемая,
+    иначе - после commit в DbSessionMiddleware (при откате callback отбрасывается)
+    """
+    if is_managed(db):
+        db.info.setdefault("after_commit", []).append(callback)
+    else:
+        callback()
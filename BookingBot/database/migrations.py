@@ -0,0 +1,69 @@
+"""
+Миграции схемы для уже существующих баз данных.
+Base.metadata.create_all создаёт индексы только вместе с новыми таблицами,
+поэтому индексы, добавленные в модели позже, досоздаются здесь
+"""
+import asyncio
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from database.database import Base, engine
+
+# Индексы, заменённые другими: (таблица, имя)
+OBSOLETE_INDEXES = (
+    ("bookings", "ix_bookings_active_org_date_time"),  # заменён уникальным uq_bookings_active_slot
+)
+
+
+def _is_duplicate_error(error: IntegrityError) -> bool:
+    """Ошибка из-за повторяющихся значений: UNIQUE в SQLite, unique_violation (23505) в PostgreSQL"""
+    if getattr(error.orig, "sqlstate", None) == "23505" or getattr(error.orig, "pgcode", None) == "23505":
+        return True
+    message = str(error.orig)
+    return "UNIQUE constraint failed" in message or "duplicate" in message.lower()
+
+
+def ensure_indexes(connection) -> list:
+    """
+    Создаёт объявленные в моделях индексы, которых ещё нет в базе
+    Возвращает: список имён созданных индексов
+    """
+    import database.models  # noqa: F401
+
+    inspector = inspect(connection)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                with connection.begin_nested():
+                    index.create(connection)
+            except IntegrityError as e:
+                # Уникальный индекс не создаётся, пока в таблице есть дубли (например, двойные брони);
+                # остальные ошибки целостности не глотаем
+                if not (index.unique and _is_duplicate_error(e)):
+                    raise
+                print(f"Индекс {index.name} не создан: в таблице {table.name} есть повторяющиеся записи")
+                continue
+            created.append(index.name)
+        for table_name, index_name in OBSOLETE_INDEXES:
+            if table_name == table.name and index_name in existing:
+                connection.exec_driver_sql(f"DROP INDEX {index_name}")
+    return created
+
+
+async def upgrade():
+    """Применяет миграции к базе из DATABASE_URL"""
+    async with engine.begin() as conn:
+        created = await conn.run_sync(ensure_indexes)
+    for name in created:
+        print(f"Создан индекс {name}")
+    if not created:
+        print("Все индексы уже существуют")
+
+
+if __name__ == "__main__":
+    asyncio.run(upgrade())
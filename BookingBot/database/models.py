@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Time, Date, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Time, Date, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database.database import Base
@@ -14,7 +14,7 @@ class Organization(Base):
     address = Column(String)  # адрес
     contact_info = Column(String)  # контактная информация
     description = Column(Text)  # описание услуги
-    admin_telegram_id = Column(Integer, nullable=False)  # ID администратора (владельца)
+    admin_telegram_id = Column(Integer, nullable=False, index=True)  # ID администратора (владельца)
     unique_code = Column(String, unique=True, default=lambda: str(uuid.uuid4())[:8])  # уникальный код для записи
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -50,6 +50,11 @@ class Schedule(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Поиск расписания организации по дню недели (get_schedule_for_date)
+        Index("ix_schedules_org_day_active", "organization_id", "day_of_week", "is_active"),
+    )
+
 
 class SpecificDate(Base):
     """Исключения для конкретных дат"""
@@ -64,6 +69,11 @@ class SpecificDate(Base):
     is_exception = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Поиск исключения организации на дату
+        Index("ix_specific_dates_org_date", "organization_id", "date"),
+    )
+
 
 class Booking(Base):
     """Бронирование"""
@@ -82,6 +92,19 @@ class Booking(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     cancelled_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # Поиск броней организации на дату с фильтром по статусу
+        Index("ix_bookings_org_date_status", "organization_id", "booking_date", "booking_status"),
+        # Частичный уникальный индекс по активным броням (PostgreSQL, SQLite):
+        # не даёт записать двух клиентов на один слот и ускоряет чтение занятых слотов дня
+        Index(
+            "uq_bookings_active_slot", "organization_id", "booking_date", "start_time",
+            unique=True,
+            postgresql_where=booking_status == "active",
+            sqlite_where=booking_status == "active"
+        ),
+    )
+
 
 class Setting(Base):
     """Настройки системы"""
@@ -92,4 +115,19 @@ class Setting(Base):
     setting_key = Column(String, nullable=False)
     setting_value = Column(Text)
     description = Column(Text)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class FsmRecord(Base):
+    """Состояние диалога aiogram (FSM) пользователя в чате"""
+    __tablename__ = "fsm_states"
+
+    storage_key = Column(String, primary_key=True)  # бот:чат:пользователь[:тред][:бизнес-подключение]:destiny
+    state = Column(String)
+    data = Column(Text)  # JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Удаление брошенных диалогов по возрасту
+        Index("ix_fsm_states_updated_at", "updated_at"),
+    )
@@ -0,0 +1,49 @@
+"""
+Модели чтения для отображения: именованные кортежи из выборки отдельных колонок.
+В отличие от ORM-сущностей они не попадают в identity map сессии и не отслеживают изменения,
+поэтому строка стоит дешевле. Для записи по-прежнему используются модели из database.models
+"""
+from datetime import date, time
+from typing import List, NamedTuple, Optional
+from database.models import Booking, Organization, User
+
+
+class BookingView(NamedTuple):
+    id: int
+    organization_id: int
+    telegram_user_id: int
+    user_full_name: Optional[str]
+    booking_date: date
+    start_time: time
+    end_time: Optional[time]
+    service_type: Optional[str]
+
+
+class UserView(NamedTuple):
+    id: int
+    telegram_id: int
+    full_name: Optional[str]
+    username: Optional[str]
+    role: str
+
+
+class OrganizationView(NamedTuple):
+    id: int
+    name: str
+    address: Optional[str]
+    contact_info: Optional[str]
+    description: Optional[str]
+    unique_code: str
+    admin_telegram_id: int
+
+
+# Колонки в порядке полей соответствующей модели чтения
+BOOKING_VIEW_COLUMNS = tuple(getattr(Booking, field) for field in BookingView._fields)
+USER_VIEW_COLUMNS = tuple(getattr(User, field) for field in UserView._fields)
+ORGANIZATION_VIEW_COLUMNS = tuple(getattr(Organization, field) for field in OrganizationView._fields)
+
+
+def to_views(result, view) -> List[NamedTuple]:
+    """Строки результата select(*колонки) -> список моделей чтения"""
+    make = view._make
+    return [make(row) for row in result]
@@ -6,41 +6,11 @@ from aiogram.filters import Command
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram import F
+from utils.slot_engine import generate_time_slots, get_available_slots_no_windows
 
 # Простой роутер для тестирования
 router = Router()
 
-# Имитация основных функций без базы данных
-def generate_time_slots(start_time: time, end_time: time, duration_minutes: int = 60) -> list:
-    """Генерирует список временных слотов между start_time и end_time с заданной длительностью"""
-    import datetime
-    slots = []
-    current_time = datetime.datetime.combine(datetime.date.today(), start_time)
-    end_datetime = datetime.datetime.combine(datetime.date.today(), end_time)
-    
-    while current_time + datetime.timedelta(minutes=duration_minutes) <= end_datetime:
-        slots.append(current_time.time())
-        current_time += datetime.timedelta(minutes=duration_minutes)
-    
-    return slots
-
-def get_available_slots_no_windows(available_slots: list, max_sessions: int, booked_slots: list = None) -> list:
-    """Упрощённая версия функции без сложной логики"""
-    if booked_slots is None:
-        booked_slots = []
-    
-    # Просто возвращаем слоты, которые не заняты
-    available_for_selection = [slot for slot in available_slots if slot not in booked_slots]
-    
-    remaining_slots_needed = max_sessions - len(booked_slots)
-    
-    if remaining_slots_needed <= 0:
-        return []
-    
-    # Возвращаем доступные слоты, ограничивая количество
-    return available_for_selection[:remaining_slots_needed*2]  # *2 просто для примера
-
-
 @router.message(Command("start"))
 async def cmd_start(message: Message):
     await message.answer(
@@ -55,6 +25,8 @@ async def cmd_book(message: Message):
     start_time = time(16, 0)
     end_time = time(20, 0)
     time_slots = generate_time_slots(start_time, end_time, 60)
+    # Тот же алгоритм "без окон", что и в основном боте (до 3 сеансов, броней нет)
+    time_slots = get_available_slots_no_windows(time_slots, 3)
     
     keyboard = InlineKeyboardBuilder()
     for slot in time_slots:
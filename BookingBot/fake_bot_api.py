@@ -0,0 +1,158 @@
+"""
+Локальная замена Telegram Bot API для нагрузочного тестирования.
+Реализует методы, которыми пользуется бот в сценарии записи: getMe, getUpdates (long polling),
+sendMessage, editMessageText, answerCallbackQuery, deleteWebhook; на остальные методы отвечает True.
+Симулированные пользователи кладут апдейты через push_message/push_callback,
+а ответы бота читают из очереди своего чата (chat_events)
+"""
+import asyncio
+import itertools
+import json
+import time as _time
+from collections import Counter, deque
+from typing import Any, Dict, NamedTuple, Optional
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Load test bot", "username": "load_test_bot"}
+
+
+class BotEvent(NamedTuple):
+    """Ответ бота в чат: сообщение (новое или отредактированное) или ответ на callback"""
+    kind: str  # "message" | "callback_answer"
+    payload: Dict[str, Any]
+
+
+class FakeBotAPI:
+    """aiohttp-сервер с методами Bot API; адрес для бота - url после start()"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.url: Optional[str] = None
+        self.calls: Counter = Counter()
+        self.polling_started = asyncio.Event()
+        self._updates: deque = deque()
+        self._new_updates = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+        self._callback_chats: Dict[str, int] = {}
+        self._chats: Dict[int, asyncio.Queue] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._methods = {
+            "getme": self._get_me,
+            "getupdates": self._get_updates,
+            "sendmessage": self._send_message,
+            "editmessagetext": self._edit_message_text,
+            "answercallbackquery": self._answer_callback_query,
+        }
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def chat_events(self, chat_id: int) -> asyncio.Queue:
+        """Очередь ответов бота в чат chat_id"""
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = asyncio.Queue()
+        return queue
+
+    def push_message(self, user: Dict[str, Any], text: str) -> Dict[str, Any]:
+        """Апдейт с текстовым сообщением пользователя user (словарь User из Bot API)"""
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(_time.time()),
+            "chat": {"id": user["id"], "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            command_length = len(text.split(maxsplit=1)[0])
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": command_length}]
+        return self._push({"message": message})
+
+    def push_callback(self, user: Dict[str, Any], message: Dict[str, Any], data: str) -> Dict[str, Any]:
+        """Апдейт с нажатием кнопки data под сообщением бота message"""
+        callback_id = str(next(self._callback_ids))
+        self._callback_chats[callback_id] = message["chat"]["id"]
+        return self._push({"callback_query": {
+            "id": callback_id,
+            "from": user,
+            "chat_instance": str(message["chat"]["id"]),
+            "message": message,
+            "data": data,
+        }})
+
+    def _push(self, update: Dict[str, Any]) -> Dict[str, Any]:
+        update["update_id"] = next(self._update_ids)
+        self._updates.append(update)
+        self._new_updates.set()
+        return update
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        self.calls[method] += 1
+        params = dict(await request.post())
+        handler = self._methods.get(method)
+        result = await handler(params) if handler is not None else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_me(self, params):
+        return BOT_USER
+
+    async def _get_updates(self, params):
+        self.polling_started.set()
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # Апдейты до offset бот подтвердил - больше их не отдаём
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(itertools.islice(self._updates, limit))
+
+    def _bot_message(self, params, message_id: int) -> Dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        message = {
+            "message_id": message_id,
+            "date": int(_time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+        if params.get("reply_markup"):
+            message["reply_markup"] = json.loads(params["reply_markup"])
+        self.chat_events(chat_id).put_nowait(BotEvent("message", message))
+        return message
+
+    async def _send_message(self, params):
+        return self._bot_message(params, next(self._message_ids))
+
+    async def _edit_message_text(self, params):
+        return self._bot_message(params, int(params["message_id"]))
+
+    async def _answer_callback_query(self, params):
+        chat_id = self._callback_chats.pop(params["callback_query_id"], None)
+        if chat_id is not None:
+            self.chat_events(chat_id).put_nowait(BotEvent("callback_answer", {
+                "text": params.get("text"),
+                "show_alert": params.get("show_alert") == "true",
+            }))
+        return True
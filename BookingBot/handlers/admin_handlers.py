@@ -1,39 +1,105 @@
-from aiogram import Router
-from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
-from keyboards.main import get_admin_keyboard
+import os
+import tempfile
+from aiogram import F, Router
+from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.filters import Command, CommandObject
+from keyboards.main import get_admin_keyboard, get_bookings_page_keyboard
+from keyboards.callbacks import BookingsPageCallback
 from database.models import User
-from database.database import SessionLocal
 from sqlalchemy import select
-from utils.booking_service import get_user_by_telegram_id, create_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.booking_service import get_user_by_telegram_id, create_user, get_organization_bookings_page
 from utils.booking_algorithm import get_organization_by_admin_id, get_organization_by_unique_code, create_organization
 from utils.states import OrganizationSetup
+from utils.organization_cache import organization_directory
+from utils.booking_export import (
+    EXPORT_FORMATS, TELEGRAM_MAX_UPLOAD_BYTES, ExportTooLargeError, export_organization_bookings
+)
 from aiogram.fsm.context import FSMContext
 
 router = Router()
 
 async def is_organization_admin(db, admin_telegram_id: int) -> bool:
     """Проверяет, является ли пользователь администратором какой-либо организации"""
-    organization = await get_organization_by_admin_id(db, admin_telegram_id)
-    return organization is not None
+    return await organization_directory.resolve_admin(db, admin_telegram_id) is not None
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
-    # Создаем сессию базы данных
-    with SessionLocal() as db:
-        # Проверяем, есть ли организация у этого пользователя
-        organization = await get_organization_by_admin_id(db, message.from_user.id)
-        
-        if not organization:
-            # Если организация не существует, предлагаем создать
-            await message.answer(
-                "Добро пожаловать!\n"
-                "Вы можете создать свою организацию (психолог, автомойка, и т.д.) и начать принимать записи от клиентов.\n"
-                "Отправьте команду /setup для настройки своей организации."
-            )
-        else:
-            await message.answer(
-                f"Привет, администратор организации {organization.name}!\n"
-                "Используй /admin для управления организацией.",
-                reply_markup=get_admin_keyboard()
-            )
+async def cmd_start(message: Message, db: AsyncSession):
+    # Сессию базы данных открывает DbSessionMiddleware
+    # Проверяем, есть ли организация у этого пользователя
+    organization = await get_organization_by_admin_id(db, message.from_user.id)
+    
+    if not organization:
+        # Если организация не существует, предлагаем создать
+        await message.answer(
+            "Добро пожаловать!\n"
+            "Вы можете создать свою организацию (психолог, автомойка, и т.д.) и начать принимать записи от клиентов.\n"
+            "Отправьте команду /setup для настройки своей организации."
+        )
+    else:
+        await message.answer(
+            f"Привет, администратор организации {organization.name}!\n"
+            "Используй /admin для управления организацией.",
+            reply_markup=get_admin_keyboard()
+        )
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject, db: AsyncSession):
+    """Выгрузка всех броней организации файлом: /export или /export jsonl"""
+    organization = await get_organization_by_admin_id(db, message.from_user.id)
+    if not organization:
+        await message.answer("Выгрузка доступна только администратору организации.")
+        return
+    export_format = (command.args or "csv").strip().lower()
+    if export_format not in EXPORT_FORMATS:
+        await message.answer(f"Поддерживаемые форматы: {', '.join(EXPORT_FORMATS)}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, f"bookings_{organization.unique_code}.{export_format}")
+        try:
+            count = await export_organization_bookings(db, organization.id, path, export_format,
+                                                       max_bytes=TELEGRAM_MAX_UPLOAD_BYTES)
+        except ExportTooLargeError:
+            await message.answer("Выгрузка больше 50 МБ - Telegram не примет такой файл.")
+            return
+        await message.answer_document(FSInputFile(path), caption=f"Броней в выгрузке: {count}")
+
+
+def _organization_bookings_text(page) -> str:
+    if not page.bookings:
+        return "Активных записей нет."
+    lines = [
+        f"{booking.booking_date:%d.%m.%Y} {booking.start_time:%H:%M} - {booking.user_full_name}"
+        for booking in page.bookings
+    ]
+    return "Записи организации:\n" + "\n".join(lines)
+
+
+@router.callback_query(F.data == "all_bookings")
+async def show_all_bookings(callback: CallbackQuery, db: AsyncSession):
+    """Первая страница записей организации"""
+    organization_id = await organization_directory.resolve_admin(db, callback.from_user.id)
+    if organization_id is None:
+        await callback.answer("Доступно только администратору организации", show_alert=True)
+        return
+    page = await get_organization_bookings_page(db, organization_id)
+    await callback.message.edit_text(_organization_bookings_text(page), reply_markup=get_bookings_page_keyboard("o", page))
+    await callback.answer()
+
+
+@router.callback_query(BookingsPageCallback.filter(F.scope == "o"))
+async def page_all_bookings(callback: CallbackQuery, callback_data: BookingsPageCallback, db: AsyncSession):
+    """Следующая/предыдущая страница записей организации"""
+    organization_id = await organization_directory.resolve_admin(db, callback.from_user.id)
+    if organization_id is None:
+        await callback.answer("Доступно только администратору организации", show_alert=True)
+        return
+    cursor = callback_data.cursor
+    if callback_data.direction == "n":
+        page = await get_organization_bookings_page(db, organization_id, after=cursor)
+    else:
+        page = await get_organization_bookings_page(db, organization_id, before=cursor)
+    await callback.message.edit_text(_organization_bookings_text(page), reply_markup=get_bookings_page_keyboard("o", page))
+    await callback.answer()
@@ -1,15 +1,17 @@
-from aiogram import Router
+from aiogram import F, Router
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from keyboards.main import get_main_keyboard, get_date_selection_keyboard, get_time_slot_keyboard
-from utils.booking_algorithm import get_schedule_for_date, get_booked_slots_for_date, generate_time_slots, get_available_slots_no_windows, get_organization_by_unique_code
-from database.database import SessionLocal
+from keyboards.main import get_main_keyboard, get_date_selection_keyboard, get_time_slot_keyboard, get_bookings_page_keyboard
+from keyboards.callbacks import BookingsPageCallback, DateCallback, DatesCallback, SlotCallback
+from utils.booking_algorithm import get_schedule_for_date, get_booked_slots_for_date, generate_time_slots, get_available_slots_no_windows, get_organization_by_unique_code, get_availability_range, get_day_availability
 from database.models import Organization
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, time, timedelta
-from utils.booking_service import register_user_if_not_exists, create_booking, get_user_by_telegram_id
+from utils.booking_service import register_user_if_not_exists, create_booking, get_user_by_telegram_id, book_slot, BookingOutcome, get_user_bookings_page
 from utils.states import BookingByCode
+from utils.organization_cache import code_attempt_limiter
 from aiogram.fsm.context import FSMContext
 
 router = Router()
@@ -40,15 +42,110 @@ async def cmd_help(message: Message):
 async def cmd_book_by_code(message: Message, state: FSMContext):
     """Начать запись по уникальному коду"""
     await message.answer("Отправьте уникальный код организации:")
-    await state.set_state(BookingByCode.waiting_for_code)
+    await state.set_state(BookingByCode.waiting_for_org_code)
 
-@router.message(BookingByCode.waiting_for_code)
-async def process_code(message: Message, state: FSMContext):
+@router.message(BookingByCode.waiting_for_org_code)
+async def process_code(message: Message, state: FSMContext, db: AsyncSession):
     """Обработать уникальный код"""
-    with SessionLocal() as db:
-        organization = get_organization_by_unique_code(db, message.text)
-        if organization:
-            await message.answer(f"Организация найдена: {organization.name}")
-            await state.clear()
-        else:
-            await message.answer("Неверный код. Попытайтесь ещё.")
+    if not code_attempt_limiter.allow(message.from_user.id):
+        await message.answer("Слишком много попыток. Попробуйте ещё раз через минуту.")
+        return
+    organization = await get_organization_by_unique_code(db, message.text)
+    if organization:
+        await state.clear()
+        await message.answer(
+            f"Организация найдена: {organization.name}\nВыберите дату:",
+            reply_markup=await _dates_keyboard(db, organization.id)
+        )
+    else:
+        await message.answer("Неверный код. Попытайтесь ещё.")
+
+
+async def _dates_keyboard(db: AsyncSession, organization_id: int):
+    today = datetime.now().date()
+    availability = await get_availability_range(db, organization_id, today, today + timedelta(days=6))
+    return get_date_selection_keyboard(organization_id, availability)
+
+# Контекст записи (организация, дата, время) приходит в подписанной callback_data, FSM не нужен.
+# Свойства callback_data равны None для подделанных или испорченных кнопок
+
+async def _answer_unavailable(callback: CallbackQuery):
+    await callback.answer("Это время недоступно, выберите другое", show_alert=True)
+
+@router.callback_query(DatesCallback.filter())
+async def show_dates(callback: CallbackQuery, callback_data: DatesCallback, db: AsyncSession):
+    """Показать даты для записи"""
+    organization_id = callback_data.organization_id
+    if organization_id is None:
+        await _answer_unavailable(callback)
+        return
+    await callback.message.edit_text(
+        "Выберите дату:",
+        reply_markup=await _dates_keyboard(db, organization_id)
+    )
+    await callback.answer()
+
+@router.callback_query(DateCallback.filter())
+async def select_date(callback: CallbackQuery, callback_data: DateCallback, db: AsyncSession):
+    """Показать свободное время на выбранную дату"""
+    organization_id, day = callback_data.organization_id, callback_data.date
+    if organization_id is None or day is None:
+        await _answer_unavailable(callback)
+        return
+    availability = await get_day_availability(db, organization_id, day)
+    if not availability.available_slots:
+        await callback.answer("На эту дату нет свободного времени", show_alert=True)
+        return
+    await callback.message.edit_text(
+        f"Свободное время на {day:%d.%m.%Y}:",
+        reply_markup=get_time_slot_keyboard(organization_id, day, availability.available_slots)
+    )
+    await callback.answer()
+
+@router.callback_query(SlotCallback.filter())
+async def select_time(callback: CallbackQuery, callback_data: SlotCallback, db: AsyncSession):
+    """Записать на выбранное время"""
+    organization_id, day, slot_time = callback_data.organization_id, callback_data.date, callback_data.time
+    if None in (organization_id, day, slot_time):
+        await _answer_unavailable(callback)
+        return
+    user = callback.from_user
+    await register_user_if_not_exists(db, user.id, user.full_name, organization_id, user.username)
+    result = await book_slot(db, organization_id, user.id, user.full_name, day, slot_time)
+    if result.ok:
+        await callback.message.edit_text(f"Вы записаны на {day:%d.%m.%Y} в {slot_time:%H:%M}.")
+        await callback.answer()
+    elif result.outcome is BookingOutcome.SLOT_TAKEN:
+        await callback.answer("Это время уже заняли, выберите другое", show_alert=True)
+    else:
+        await _answer_unavailable(callback)
+
+
+def _user_bookings_text(page) -> str:
+    if not page.bookings:
+        return "У вас нет активных записей."
+    lines = [f"{booking.booking_date:%d.%m.%Y} {booking.start_time:%H:%M}" for booking in page.bookings]
+    return "Ваши записи:\n" + "\n".join(lines)
+
+@router.message(Command("my_bookings"))
+async def cmd_my_bookings(message: Message, db: AsyncSession):
+    """Первая страница записей пользователя"""
+    page = await get_user_bookings_page(db, message.from_user.id)
+    await message.answer(_user_bookings_text(page), reply_markup=get_bookings_page_keyboard("u", page))
+
+@router.callback_query(F.data == "my_bookings")
+async def show_my_bookings(callback: CallbackQuery, db: AsyncSession):
+    page = await get_user_bookings_page(db, callback.from_user.id)
+    await callback.message.edit_text(_user_bookings_text(page), reply_markup=get_bookings_page_keyboard("u", page))
+    await callback.answer()
+
+@router.callback_query(BookingsPageCallback.filter(F.scope == "u"))
+async def page_my_bookings(callback: CallbackQuery, callback_data: BookingsPageCallback, db: AsyncSession):
+    """Следующая/предыдущая страница записей пользователя"""
+    cursor = callback_data.cursor
+    if callback_data.direction == "n":
+        page = await get_user_bookings_page(db, callback.from_user.id, after=cursor)
+    else:
+        page = await get_user_bookings_page(db, callback.from_user.id, before=cursor)
+    await callback.message.edit_text(_user_bookings_text(page), reply_markup=get_bookings_page_keyboard("u", page))
+    await callback.answer()
@@ -0,0 +1,115 @@
+"""
+Хранилище данных упрощённой версии бота (simple_bot_demo) без внешних зависимостей.
+Каждое изменение дописывается в журнал одной строкой JSON (JSONL), поэтому запись
+не зависит от объёма накопленных данных. Журнал периодически сворачивается в снимок
+(обычный JSON-файл, прежний формат booking_data.json), снимок заменяется атомарно.
+При загрузке к снимку применяются записи журнала; недописанная при сбое
+последняя строка отбрасывается.
+
+Строки журнала сбрасываются в ОС сразу (падение процесса их не теряет),
+а fsync на диск выполняется пакетно: раз в fsync_every записей или fsync_interval секунд.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+
+def _set_path(data, path, value):
+    """Записывает value по пути ключей, создавая промежуточные словари"""
+    node = data
+    for key in path[:-1]:
+        node = node.setdefault(key, {})
+    node[path[-1]] = value
+
+
+class JournalStore:
+    def __init__(self, snapshot_path, journal_path=None, fsync_every=50, fsync_interval=1.0,
+                 compact_every=1000, default=None):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = Path(journal_path) if journal_path else Path(f"{self.snapshot_path}.journal")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.default = default or {}
+        self.data = None
+        self._journal = None
+        self._journal_records = 0  # записей в журнале после последнего снимка
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def load(self):
+        """Читает снимок и применяет к нему журнал; возвращает словарь данных"""
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        else:
+            self.data = json.loads(json.dumps(self.default))
+
+        self._journal_records = 0
+        valid_size = 0
+        if self.journal_path.exists():
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # недописанная строка: дальше журнал не читаем
+                    if not line.endswith(b"\n"):
+                        break
+                    _set_path(self.data, record['path'], record['value'])
+                    self._journal_records += 1
+                    valid_size += len(line)
+            # Обрезаем хвост после сбоя, чтобы новые записи не склеились с ним
+            if valid_size != self.journal_path.stat().st_size:
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(valid_size)
+        self._open_journal()
+        return self.data
+
+    def set(self, path, value):
+        """Меняет значение по пути ключей и дописывает изменение в журнал"""
+        path = [str(key) for key in path]
+        _set_path(self.data, path, value)
+        self._journal.write(json.dumps({'path': path, 'value': value}, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self._journal_records += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+        if self.compact_every and self._journal_records >= self.compact_every:
+            self.compact()
+
+    def sync(self):
+        """Принудительно записывает журнал на диск"""
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Сворачивает журнал в снимок: снимок заменяется атомарно, затем журнал очищается"""
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Если упасть до очистки журнала, его записи применятся к новому снимку повторно -
+        # это безопасно, каждая запись просто устанавливает значение
+        self._journal.close()
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        os.fsync(self._journal.fileno())
+        self._journal_records = 0
+        self._unsynced = 0
+
+    def close(self):
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+    def _open_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
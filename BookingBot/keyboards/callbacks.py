@@ -0,0 +1,170 @@
+"""
+Компактные callback_data для записи без FSM.
+Каждая кнопка несёт весь контекст: id организации, день (смещение в днях от EPOCH)
+и время слота (минуты от начала суток), все числа - в base36.
+Кнопки записи подписаны: sig - усечённый HMAC-SHA256 остальных полей, иначе клиент мог бы
+подставить чужой id организации и записаться в обход /code.
+Например, слот 14:30 на 18.10.2026 у организации 12345: "t:9ix:sd:o6:<11 символов подписи>" (23 байта из 64).
+Некорректные или неподписанные данные дают None в свойствах, а не исключение
+"""
+import base64
+import hashlib
+import hmac
+import os
+from datetime import date, time, timedelta
+from typing import Optional
+from aiogram.filters.callback_data import CallbackData
+
+EPOCH = date(2024, 1, 1)
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Ключ подписи общий для всех процессов бота. Без CALLBACK_SECRET и BOT_TOKEN (тесты, бенчмарки)
+# берётся случайный: кнопки тогда действуют только в выдавшем их процессе
+CALLBACK_SECRET = (os.getenv('CALLBACK_SECRET') or os.getenv('BOT_TOKEN') or '').encode() or os.urandom(32)
+
+_MAX_DAY = (date.max - EPOCH).days
+_MINUTES_PER_DAY = 24 * 60
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        raise ValueError("Отрицательные значения не кодируются")
+    encoded = ""
+    while True:
+        value, digit = divmod(value, 36)
+        encoded = _DIGITS[digit] + encoded
+        if not value:
+            return encoded
+
+
+def from_base36(value: str) -> int:
+    return int(value, 36)
+
+
+def _parse_base36(value: str, limit: int) -> Optional[int]:
+    """Число из base36 в [0, limit] или None, если value не base36 или вне диапазона"""
+    if not value or len(value) > 13 or value.strip(_DIGITS):
+        return None
+    number = int(value, 36)
+    return number if number <= limit else None
+
+
+def _sign(prefix: str, *fields: str) -> str:
+    payload = ":".join((prefix,) + fields).encode()
+    digest = hmac.new(CALLBACK_SECRET, payload, hashlib.sha256).digest()[:8]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _signed(callback: CallbackData, *fields: str) -> bool:
+    return hmac.compare_digest(callback.sig.encode(), _sign(callback.__prefix__, *fields).encode())
+
+
+def _decode_organization(callback: CallbackData, *fields: str) -> Optional[int]:
+    """id организации из подписанной кнопки; None - подделка или мусор"""
+    if not _signed(callback, callback.org, *fields):
+        return None
+    return _parse_base36(callback.org, 2 ** 63 - 1)
+
+
+def _decode_day(value: str) -> Optional[date]:
+    days = _parse_base36(value, _MAX_DAY)
+    return None if days is None else EPOCH + timedelta(days=days)
+
+
+class DatesCallback(CallbackData, prefix="b"):
+    """Список дат для записи в организацию"""
+    org: str
+    sig: str
+
+    @classmethod
+    def build(cls, organization_id: int) -> "DatesCallback":
+        org = to_base36(organization_id)
+        return cls(org=org, sig=_sign(cls.__prefix__, org))
+
+    @property
+    def organization_id(self) -> Optional[int]:
+        return _decode_organization(self)
+
+
+class DateCallback(CallbackData, prefix="d"):
+    """Выбор даты"""
+    org: str
+    day: str
+    sig: str
+
+    @classmethod
+    def build(cls, organization_id: int, day: date) -> "DateCallback":
+        org, day = to_base36(organization_id), to_base36((day - EPOCH).days)
+        return cls(org=org, day=day, sig=_sign(cls.__prefix__, org, day))
+
+    @property
+    def organization_id(self) -> Optional[int]:
+        return _decode_organization(self, self.day)
+
+    @property
+    def date(self) -> Optional[date]:
+        return _decode_day(self.day)
+
+
+class SlotCallback(CallbackData, prefix="t"):
+    """
+    Выбор времени. Слот кодируется минутами от начала суток, а не номером в сетке дня:
+    так нажатие остаётся верным, даже если расписание успели изменить
+    """
+    org: str
+    day: str
+    slot: str
+    sig: str
+
+    @classmethod
+    def build(cls, organization_id: int, day: date, slot_time: time) -> "SlotCallback":
+        org = to_base36(organization_id)
+        day = to_base36((day - EPOCH).days)
+        slot = to_base36(slot_time.hour * 60 + slot_time.minute)
+        return cls(org=org, day=day, slot=slot, sig=_sign(cls.__prefix__, org, day, slot))
+
+    @property
+    def organization_id(self) -> Optional[int]:
+        return _decode_organization(self, self.day, self.slot)
+
+    @property
+    def date(self) -> Optional[date]:
+        return _decode_day(self.day)
+
+    @property
+    def time(self) -> Optional[time]:
+        minutes = _parse_base36(self.slot, _MINUTES_PER_DAY - 1)
+        return None if minutes is None else time(minutes // 60, minutes % 60)
+
+
+class BookingsPageCallback(CallbackData, prefix="p"):
+    """
+    Листание списка броней: scope "u" - мои записи, "o" - записи организации администратора;
+    direction "n" - страница после курсора, "p" - перед ним.
+    Курсор (дата, время, id брони): порядковый номер даты, секунды от начала суток и id
+    """
+    scope: str
+    direction: str
+    day: str
+    second: str
+    id: str
+
+    @classmethod
+    def build(cls, scope: str, direction: str, cursor) -> "BookingsPageCallback":
+        booking_date, start_time, booking_id = cursor
+        return cls(
+            scope=scope,
+            direction=direction,
+            day=to_base36(booking_date.toordinal()),
+            second=to_base36(start_time.hour * 3600 + start_time.minute * 60 + start_time.second),
+            id=to_base36(booking_id),
+        )
+
+    @property
+    def cursor(self):
+        seconds = from_base36(self.second)
+        return (
+            date.fromordinal(from_base36(self.day)),
+            time(seconds // 3600, seconds % 3600 // 60, seconds % 60),
+            from_base36(self.id),
+        )
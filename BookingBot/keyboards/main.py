@@ -1,10 +1,15 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Iterable, Tuple
+from keyboards.callbacks import BookingsPageCallback, DateCallback, DatesCallback, SlotCallback
 
+# Клавиатуры ниже создаются один раз и отдаются всем сообщениям:
+# изменять возвращённые объекты нельзя
 
-def get_main_keyboard():
-    """Основная клавиатура для клиентов"""
+
+def _build_main_keyboard() -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardBuilder()
     keyboard.add(InlineKeyboardButton(text="📅 Записаться", callback_data="book_appointment"))
     keyboard.add(InlineKeyboardButton(text="📋 Мои записи", callback_data="my_bookings"))
@@ -12,8 +17,7 @@ def get_main_keyboard():
     return keyboard.adjust(1).as_markup()
 
 
-def get_admin_keyboard():
-    """Клавиатура для администратора"""
+def _build_admin_keyboard() -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardBuilder()
     keyboard.add(InlineKeyboardButton(text="📊 Управление расписанием", callback_data="manage_schedule"))
     keyboard.add(InlineKeyboardButton(text="📋 Все записи", callback_data="all_bookings"))
@@ -22,33 +26,81 @@ def get_admin_keyboard():
     return keyboard.adjust(1).as_markup()
 
 
-def get_date_selection_keyboard():
-    """Клавиатура для выбора даты"""
+MAIN_KEYBOARD = _build_main_keyboard()
+ADMIN_KEYBOARD = _build_admin_keyboard()
+
+
+def get_main_keyboard():
+    """Основная клавиатура для клиентов"""
+    return MAIN_KEYBOARD
+
+
+def get_admin_keyboard():
+    """Клавиатура для администратора"""
+    return ADMIN_KEYBOARD
+
+
+def get_date_selection_keyboard(organization_id: int, availability=None):
+    """
+    Клавиатура для выбора даты в организации organization_id
+    availability - результат get_availability_range: дни со свободными слотами
+    отмечаются ✅, полностью занятые или нерабочие - ❌
+    """
     keyboard = InlineKeyboardBuilder()
     
     # Показываем ближайшие 7 дней
     for i in range(7):
         date = datetime.now() + timedelta(days=i)
         date_str = date.strftime("%d.%m.%Y (%A)")
+        if availability is not None:
+            day = availability.get(date.date())
+            date_str = f"{'✅' if day and day.available_slots else '❌'} {date_str}"
         keyboard.add(InlineKeyboardButton(
             text=date_str, 
-            callback_data=f"select_date_{date.strftime('%Y-%m-%d')}"
+            callback_data=DateCallback.build(organization_id, date.date()).pack()
         ))
     
     keyboard.add(InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main"))
     return keyboard.adjust(1).as_markup()
 
 
-def get_time_slot_keyboard(time_slots):
-    """Клавиатура для выбора временного слота"""
+def get_time_slot_keyboard(organization_id: int, day, time_slots: Iterable[time]):
+    """Клавиатура для выбора временного слота на дату day"""
+    # Ключ кэша - минуты от начала суток: одинаковые наборы слотов дают одну клавиатуру
+    return _time_slot_keyboard(organization_id, day, tuple(slot.hour * 60 + slot.minute for slot in time_slots))
+
+
+@lru_cache(maxsize=512)
+def _time_slot_keyboard(organization_id: int, day, slot_minutes: Tuple[int, ...]) -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardBuilder()
     
-    for time_slot in time_slots:
-        time_str = time_slot.strftime("%H:%M")
+    for minutes in slot_minutes:
+        slot_time = time(minutes // 60, minutes % 60)
         keyboard.add(InlineKeyboardButton(
-            text=time_str, 
-            callback_data=f"select_time_{time_str}"
+            text=f"{slot_time:%H:%M}", 
+            callback_data=SlotCallback.build(organization_id, day, slot_time).pack()
         ))
     
-    keyboard.add(InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_dates"))
-    return keyboard.adjust(3).as_markup()  # 3 кнопки в ряд для лучшего отображения
\ No newline at end of file
+    keyboard.add(InlineKeyboardButton(text="🔙 Назад", callback_data=DatesCallback.build(organization_id).pack()))
+    return keyboard.adjust(3).as_markup()  # 3 кнопки в ряд для лучшего отображения
+
+
+def get_bookings_page_keyboard(scope: str, page):
+    """
+    Кнопки листания страницы броней (page - BookingPage)
+    scope: "u" - мои записи, "o" - все записи организации
+    """
+    keyboard = InlineKeyboardBuilder()
+    navigation = []
+    if page.prev_cursor is not None:
+        navigation.append(InlineKeyboardButton(
+            text="⬅️", callback_data=BookingsPageCallback.build(scope, "p", page.prev_cursor).pack()
+        ))
+    if page.next_cursor is not None:
+        navigation.append(InlineKeyboardButton(
+            text="➡️", callback_data=BookingsPageCallback.build(scope, "n", page.next_cursor).pack()
+        ))
+    if navigation:
+        keyboard.row(*navigation)
+    keyboard.row(InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_main"))
+    return keyboard.as_markup()
@@ -1,8 +1,43 @@
 import asyncio
 import os
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from database.database import init_db
+from database.database import init_db, dispose_engines, AsyncSessionLocal, FsmSessionLocal
+from middlewares import DbSessionMiddleware
+from utils.fsm_storage import create_fsm_storage
+from utils.organization_cache import organization_directory
+from utils.user_activity import interaction_buffer
+
+
+async def on_startup():
+    async with AsyncSessionLocal() as db:
+        await organization_directory.load(db)
+    interaction_buffer.start(AsyncSessionLocal)
+
+
+async def on_shutdown():
+    await interaction_buffer.stop(AsyncSessionLocal)
+    await dispose_engines()
+
+
+def create_dispatcher() -> Dispatcher:
+    """Диспетчер с хранилищем состояний, middleware и хендлерами - общий для polling и webhook"""
+    # Создание диспетчера с хранилищем состояний в БД: диалоги переживают перезапуск
+    # и общие для нескольких процессов за webhook
+    storage = create_fsm_storage(FsmSessionLocal)
+    dp = Dispatcher(storage=storage)
+    
+    # Одна сессия БД на апдейт: хендлеры получают её в аргументе db
+    dp.update.outer_middleware(DbSessionMiddleware(AsyncSessionLocal))
+    
+    # Регистрация хендлеров
+    from handlers import admin_handlers, client_handlers
+    dp.include_router(admin_handlers.router)
+    dp.include_router(client_handlers.router)
+    
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
 
 async def main():
     # Получение токена из переменной окружения
@@ -10,23 +45,25 @@ async def main():
     if not bot_token:
         raise ValueError("Необходимо установить BOT_TOKEN в переменных окружения")
     
-    # Создание диспетчера с хранилищем состояний
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    # Режим получения апдейтов: polling (по умолчанию) или webhook
+    mode = os.getenv('BOT_MODE', 'polling').strip().lower()
+    if mode not in ("polling", "webhook"):
+        raise ValueError(f"Неизвестный режим BOT_MODE: {mode}")
     
     # Инициализация базы данных
     await init_db()
     
     # Создание бота
     bot = Bot(token=bot_token)
-    
-    # Регистрация хендлеров
-    from handlers import admin_handlers, client_handlers
-    dp.include_router(admin_handlers.router)
-    dp.include_router(client_handlers.router)
+    dp = create_dispatcher()
     
     # Запуск бота
-    await dp.start_polling(bot)
+    if mode == "webhook":
+        from webhook_server import load_webhook_settings, run_webhook
+        await run_webhook(dp, bot, load_webhook_settings())
+    else:
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
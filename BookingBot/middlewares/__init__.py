@@ -0,0 +1,3 @@
+from middlewares.db_session import DbSessionMiddleware
+
+__all__ = ["DbSessionMiddleware"]
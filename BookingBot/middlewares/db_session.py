@@ -0,0 +1,38 @@
+"""
+Сессия базы данных на один апдейт Telegram.
+Middleware открывает AsyncSession, передаёт её хендлеру в аргументе db и в конце
+один раз фиксирует или откатывает транзакцию; соединение возвращается в пул
+при закрытии сессии, даже если хендлер упал
+"""
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    def __init__(self, session_factory):
+        super().__init__()
+        self.session_factory = session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.session_factory() as db:
+            db.info["managed"] = True
+            data["db"] = db
+            try:
+                result = await handler(event, data)
+                if db.in_transaction():
+                    await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            finally:
+                callbacks = db.info.pop("after_commit", [])
+            # Сбрасываем кэши только после успешной фиксации
+            for callback in callbacks:
+                callback()
+            return result
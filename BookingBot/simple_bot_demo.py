@@ -1,32 +1,67 @@
 import asyncio
-import json
 import os
 from datetime import datetime, timedelta, time
 from pathlib import Path
+from journal_store import JournalStore
+from utils.slot_engine import (
+    SlotRepository, build_day_availability, generate_time_slots,
+    get_available_slots_no_windows, has_window_in_combination
+)
 
 # Простая реализация бота без внешних зависимостей
 
 class SimpleBookingBot:
-    def __init__(self):
-        self.data_file = Path("booking_data.json")
+    def __init__(self, data_file="booking_data.json"):
+        self.data_file = Path(data_file)
+        # Изменения дописываются в журнал booking_data.json.journal,
+        # booking_data.json - снимок, в который журнал периодически сворачивается
+        self.store = JournalStore(self.data_file, default={
+            'organizations': {},
+            'users': {},
+            'bookings': {}
+        })
         self.load_data()
     
     def load_data(self):
-        """Загружает данные из файла"""
-        if self.data_file.exists():
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
-        else:
-            self.data = {
-                'organizations': {},
-                'users': {},
-                'bookings': {}
-            }
+        """Загружает данные из файла (снимок + журнал изменений)"""
+        self.data = self.store.load()
+        self._rebuild_indexes()
+    
+    def _rebuild_indexes(self):
+        """
+        Индексы поверх self.data, чтобы поиск не перебирал все записи:
+        код -> id организации, администратор -> id организации,
+        (id организации, дата) -> времена броней, пользователь -> id его броней
+        """
+        self._org_by_code = {}
+        self._org_by_admin = {}
+        self._booked_by_day = {}
+        self._bookings_by_user = {}
+        for org in self.data['organizations'].values():
+            self._index_organization(org)
+        for booking in self.data['bookings'].values():
+            self._index_booking(booking)
+    
+    def _index_organization(self, org):
+        self._org_by_code[org['unique_code']] = org['id']
+        # При нескольких организациях у администратора - первая, как при переборе
+        self._org_by_admin.setdefault(str(org['admin_telegram_id']), org['id'])
+    
+    def _index_booking(self, booking):
+        # Слоты занимают только активные брони, как в SqlSlotRepository
+        if booking.get('booking_status', 'active') == 'active':
+            day_key = (booking['organization_id'], booking['booking_date'])
+            start_time = datetime.strptime(booking['start_time'], '%H:%M').time()
+            self._booked_by_day.setdefault(day_key, []).append(start_time)
+        self._bookings_by_user.setdefault(str(booking['user_id']), []).append(booking['id'])
     
     def save_data(self):
-        """Сохраняет данные в файл"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """Сохраняет все данные в снимок и очищает журнал"""
+        self.store.compact()
+    
+    def close(self):
+        """Сбрасывает журнал на диск и закрывает его"""
+        self.store.close()
     
     def create_organization(self, admin_id, name, address, contact_info, description):
         """Создает новую организацию"""
@@ -34,7 +69,7 @@ class SimpleBookingBot:
         unique_code = str(uuid.uuid4())[:8]
         
         org_id = str(len(self.data['organizations']) + 1)
-        self.data['organizations'][org_id] = {
+        self.store.set(('organizations', org_id), {
             'id': org_id,
             'name': name,
             'address': address,
@@ -44,24 +79,31 @@ class SimpleBookingBot:
             'unique_code': unique_code,
             'schedules': {},  # расписания по дням недели
             'specific_dates': {},  # исключения для конкретных дат
-        }
+        })
+        self._index_organization(self.data['organizations'][org_id])
         
         # Добавляем администратора как пользователя
-        self.data['users'][str(admin_id)] = {
+        self.store.set(('users', str(admin_id)), {
             'telegram_id': admin_id,
             'organization_id': org_id,
             'role': 'admin'
-        }
+        })
         
-        self.save_data()
         return unique_code
     
     def get_organization_by_code(self, code):
         """Получает организацию по уникальному коду"""
-        for org_id, org in self.data['organizations'].items():
-            if org['unique_code'] == code:
-                return org
-        return None
+        org_id = self._org_by_code.get(code)
+        return self.data['organizations'][org_id] if org_id is not None else None
+    
+    def get_organization_by_admin(self, admin_id):
+        """Получает организацию администратора"""
+        org_id = self._org_by_admin.get(str(admin_id))
+        return self.data['organizations'][org_id] if org_id is not None else None
+    
+    def get_user_bookings(self, user_id):
+        """Получает брони пользователя"""
+        return [self.data['bookings'][booking_id] for booking_id in self._bookings_by_user.get(str(user_id), [])]
     
     def get_schedule_for_date(self, org_id, date):
         """Получает расписание для конкретной даты"""
@@ -77,7 +119,7 @@ class SimpleBookingBot:
             return (
                 datetime.strptime(specific['start_time'], '%H:%M').time(),
                 datetime.strptime(specific['end_time'], '%H:%M').time(),
-                specific.get('max_sessions_per_day', 1),
+                specific.get('max_sessions_per_day') or 1,  # как в основном боте: None -> 1
                 60  # по умолчанию 60 минут
             )
         
@@ -97,85 +139,30 @@ class SimpleBookingBot:
     def get_booked_slots_for_date(self, org_id, date):
         """Получает забронированные слоты для даты"""
         date_str = date.strftime('%Y-%m-%d')
-        booked = []
-        
-        for booking_id, booking in self.data['bookings'].items():
-            if booking['organization_id'] == org_id and booking['booking_date'] == date_str:
-                booked.append(datetime.strptime(booking['start_time'], '%H:%M').time())
-        
-        return booked
+        return list(self._booked_by_day.get((org_id, date_str), []))
+    
+    def get_day_availability(self, org_id, date):
+        """Расписание и безопасные слоты на дату - тем же движком, что и основной бот"""
+        schedule = self.get_schedule_for_date(org_id, date)
+        booked_slots = self.get_booked_slots_for_date(org_id, date) if schedule[0] else []
+        return build_day_availability(schedule, booked_slots)
     
     def generate_time_slots(self, start_time, end_time, duration_minutes=60):
         """Генерирует временные слоты"""
-        slots = []
-        current_time = datetime.combine(datetime.today(), start_time)
-        end_datetime = datetime.combine(datetime.today(), end_time)
-        
-        while current_time + timedelta(minutes=duration_minutes) <= end_datetime:
-            slots.append(current_time.time())
-            current_time += timedelta(minutes=duration_minutes)
-        
-        return slots
+        return generate_time_slots(start_time, end_time, duration_minutes)
     
     def has_window_in_combination(self, combination):
         """Проверяет, есть ли окна в комбинации"""
-        if len(combination) <= 1:
-            return False
-        
-        sorted_times = sorted(combination)
-        
-        for i in range(len(sorted_times) - 1):
-            current = datetime.combine(datetime.today(), sorted_times[i])
-            next_time = datetime.combine(datetime.today(), sorted_times[i + 1])
-            
-            # Если разница больше чем длительность одного слота (1 час), значит есть окно
-            if next_time - current > timedelta(hours=1):
-                return True
-        
-        return False
+        return has_window_in_combination(combination)
     
     def get_available_slots_no_windows(self, available_slots, max_sessions, booked_slots=None):
         """Получает доступные слоты без окон"""
-        if booked_slots is None:
-            booked_slots = []
-        
-        import itertools
-        
-        available_for_selection = [slot for slot in available_slots if slot not in booked_slots]
-        
-        remaining_slots_needed = max_sessions - len(booked_slots)
-        
-        if remaining_slots_needed <= 0:
-            return []
-        
-        # Проверяем каждый доступный слот - может ли его выбор привести к комбинации без окон
-        safe_slots = []
-        
-        for slot in available_for_selection:
-            # Проверим, может ли добавление этого слота привести к валидной комбинации
-            found_valid = False
-            
-            # Проверим все возможные комбинации с этим слотом
-            for r in range(remaining_slots_needed + 1):
-                for combo in itertools.combinations(available_for_selection, r):
-                    if slot not in combo:
-                        continue  # Нам нужны комбинации с этим слотом
-                    full_combo = sorted(booked_slots + list(combo))
-                    if len(full_combo) <= max_sessions and not self.has_window_in_combination(full_combo):
-                        found_valid = True
-                        break
-                if found_valid:
-                    break
-            
-            if found_valid:
-                safe_slots.append(slot)
-        
-        return safe_slots
+        return get_available_slots_no_windows(available_slots, max_sessions, booked_slots)
     
     def create_booking(self, org_id, user_id, user_name, booking_date, start_time, end_time):
         """Создает новую бронь"""
         booking_id = str(len(self.data['bookings']) + 1)
-        self.data['bookings'][booking_id] = {
+        self.store.set(('bookings', booking_id), {
             'id': booking_id,
             'organization_id': org_id,
             'user_id': user_id,
@@ -185,43 +172,48 @@ class SimpleBookingBot:
             'end_time': end_time.strftime('%H:%M'),
             'booking_status': 'active',
             'created_at': datetime.now().isoformat()
-        }
+        })
+        self._index_booking(self.data['bookings'][booking_id])
         
-        self.save_data()
         return booking_id
     
     def set_schedule_for_day(self, org_id, day_of_week, start_time, end_time, max_sessions_per_day=1, session_duration=60):
         """Устанавливает расписание для определенного дня недели (0-понедельник, 6-воскресенье)"""
         if org_id in self.data['organizations']:
-            if 'schedules' not in self.data['organizations'][org_id]:
-                self.data['organizations'][org_id]['schedules'] = {}
-            
-            self.data['organizations'][org_id]['schedules'][str(day_of_week)] = {
+            self.store.set(('organizations', org_id, 'schedules', str(day_of_week)), {
                 'start_time': start_time,
                 'end_time': end_time,
                 'max_sessions_per_day': max_sessions_per_day,
                 'session_duration': session_duration
-            }
-            self.save_data()
+            })
             return True
         return False
     
     def set_specific_date_schedule(self, org_id, date_str, start_time, end_time, max_sessions_per_day=None):
         """Устанавливает расписание для конкретной даты"""
         if org_id in self.data['organizations']:
-            if 'specific_dates' not in self.data['organizations'][org_id]:
-                self.data['organizations'][org_id]['specific_dates'] = {}
-            
-            self.data['organizations'][org_id]['specific_dates'][date_str] = {
+            self.store.set(('organizations', org_id, 'specific_dates', date_str), {
                 'start_time': start_time,
                 'end_time': end_time,
                 'max_sessions_per_day': max_sessions_per_day
-            }
-            self.save_data()
+            })
             return True
         return False
 
 
+class JsonSlotRepository(SlotRepository):
+    """Расписания и брони SimpleBookingBot для движка слотов (utils.slot_engine)"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    async def get_schedule(self, organization_id, day):
+        return self.bot.get_schedule_for_date(organization_id, day)
+    
+    async def get_booked_slots(self, organization_id, day):
+        return self.bot.get_booked_slots_for_date(organization_id, day)
+
+
 def print_instructions():
     print("УПРОЩЕННЫЙ ТЕЛЕГРАМ-БОТ ДЛЯ ЗАПИСИ 'БЕЗ ОКОН'")
     print("=" * 50)
@@ -273,11 +265,7 @@ def main():
             print("\n--- ПОЛУЧЕНИЕ КОДА ОРГАНИЗАЦИИ ---")
             admin_id = input("Ваш ID администратора: ")
             
-            org = None
-            for org_id, organization in bot.data['organizations'].items():
-                if str(organization['admin_telegram_id']) == str(admin_id):
-                    org = organization
-                    break
+            org = bot.get_organization_by_admin(admin_id)
             
             if org:
                 print(f"✓ Организация: {org['name']}")
@@ -314,19 +302,15 @@ def main():
                 print("Неверный выбор даты")
                 continue
             
-            # Получаем расписание для выбранной даты
-            start_time, end_time, max_sessions, duration = bot.get_schedule_for_date(org['id'], selected_date)
+            # Расписание на выбранную дату и слоты по алгоритму "без окон"
+            availability = bot.get_day_availability(org['id'], selected_date)
             
-            if not start_time:
+            if not availability.start_time:
                 print("✗ На эту дату нет расписания. Администратор должен сначала установить расписание.")
                 continue
             
-            # Генерируем временные слоты
-            time_slots = bot.generate_time_slots(start_time, end_time, duration)
-            booked_slots = bot.get_booked_slots_for_date(org['id'], selected_date)
-            
-            # Применяем алгоритм "без окон"
-            available_slots = bot.get_available_slots_no_windows(time_slots, max_sessions, booked_slots)
+            duration = availability.session_duration
+            available_slots = availability.available_slots
             
             if not available_slots:
                 print("✗ Нет доступных слотов на эту дату")
@@ -375,11 +359,7 @@ def main():
             print("\n--- ИНФОРМАЦИЯ ОБ ОРГАНИЗАЦИИ ---")
             admin_id = input("Ваш ID администратора: ")
             
-            org = None
-            for org_id, organization in bot.data['organizations'].items():
-                if str(organization['admin_telegram_id']) == str(admin_id):
-                    org = organization
-                    break
+            org = bot.get_organization_by_admin(admin_id)
             
             if org:
                 print(f"\nИНФОРМАЦИЯ О ВАШЕЙ ОРГАНИЗАЦИИ:")
@@ -412,11 +392,7 @@ def main():
             print("\n--- УСТАНОВКА РАСПИСАНИЯ ---")
             admin_id = input("Ваш ID администратора: ")
             
-            org = None
-            for org_id, organization in bot.data['organizations'].items():
-                if str(organization['admin_telegram_id']) == str(admin_id):
-                    org = organization
-                    break
+            org = bot.get_organization_by_admin(admin_id)
             
             if not org:
                 print("✗ Организация с таким администратором не найдена")
@@ -507,6 +483,7 @@ def main():
                 print("Неверный выбор")
         
         elif command == 'exit':
+            bot.close()
             print("\nСпасибо за использование упрощенной версии бота!")
             print("Для полной версии с GUI и интеграцией с Telegram вам понадобится:")
             print("- Установить Rust на вашу систему")
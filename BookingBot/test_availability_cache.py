@@ -0,0 +1,113 @@
+from datetime import date, time, timedelta
+from sqlalchemy import event
+from database.models import Organization
+from utils.availability_cache import AvailabilityCache, DayAvailability, availability_cache
+from utils.booking_algorithm import (
+    get_availability_range,
+    get_day_availability,
+    set_schedule_for_day,
+    set_specific_date
+)
+from utils.booking_service import cancel_booking, create_booking
+from utils.schedule_store import schedule_store
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _value(*slots):
+    return DayAvailability(time(9, 0), time(12, 0), 3, 60, list(slots))
+
+
+def test_cache_ttl_and_lru():
+    clock = FakeClock()
+    cache = AvailabilityCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set(1, date(2025, 1, 1), _value(time(9, 0)))
+    cache.set(1, date(2025, 1, 2), _value())
+    assert cache.get(1, date(2025, 1, 1)).available_slots == [time(9, 0)]
+    # 2 января использовалось давнее всех - вытесняется
+    cache.set(2, date(2025, 1, 1), _value())
+    assert cache.get(1, date(2025, 1, 2)) is None
+    clock.now = 11
+    assert cache.get(1, date(2025, 1, 1)) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 1, "size": 1}
+
+
+def test_cache_invalidate_organization():
+    cache = AvailabilityCache()
+    cache.set(1, date(2025, 1, 1), _value())
+    cache.set(1, date(2025, 1, 2), _value())
+    cache.set(2, date(2025, 1, 1), _value())
+    cache.invalidate(1)
+    assert cache.get(1, date(2025, 1, 1)) is None
+    assert cache.get(2, date(2025, 1, 1)) is not None
+
+
+async def _booking_flow(engine, session_factory):
+    availability_cache.clear()
+    day = date(2025, 3, 3)  # понедельник
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        await set_schedule_for_day(db, org.id, day.weekday(), time(16, 0), time(20, 0), 3, 60)
+
+        first = await get_day_availability(db, org.id, day)
+        assert first.available_slots == [time(16, 0), time(17, 0), time(18, 0), time(19, 0)]
+        assert await get_day_availability(db, org.id, day) is first
+
+        booking = await create_booking(db, org.id, 42, "Клиент", day, time(17, 0), time(18, 0))
+        after_booking = await get_day_availability(db, org.id, day)
+        assert after_booking.available_slots == [time(16, 0), time(18, 0), time(19, 0)]
+
+        assert await cancel_booking(db, booking.id, 42)
+        assert (await get_day_availability(db, org.id, day)).available_slots == first.available_slots
+
+
+def test_cache_invalidated_by_booking_writes(run_with_database):
+    run_with_database(_booking_flow, name=None)
+
+
+async def _range_flow(engine, session_factory):
+    availability_cache.clear()
+    schedule_store.invalidate()
+    monday = date.today() + timedelta(days=7 - date.today().weekday())
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        for day_of_week in range(5):
+            await set_schedule_for_day(db, org.id, day_of_week, time(10, 0), time(13, 0), 2, 60)
+        await set_specific_date(db, org.id, monday + timedelta(days=2), time(9, 0), time(10, 0), 1)
+        await create_booking(db, org.id, 7, "Клиент", monday, time(10, 0), time(11, 0))
+        await create_booking(db, org.id, 8, "Клиент", monday, time(11, 0), time(12, 0))
+
+        statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        availability_cache.clear()
+        schedule_store.invalidate()
+        week = await get_availability_range(db, org.id, monday, monday + timedelta(days=6))
+        # Снимок расписания (два запроса) и брони на всю неделю
+        assert len(statements) == 3
+        availability_cache.clear()
+        statements.clear()
+        assert await get_availability_range(db, org.id, monday, monday + timedelta(days=6)) == week
+        assert len(statements) == 1
+
+        availability_cache.clear()
+        for day, value in week.items():
+            assert await get_day_availability(db, org.id, day) == value
+        assert week[monday].available_slots == []
+        assert week[monday + timedelta(days=1)].available_slots == [time(10, 0), time(11, 0), time(12, 0)]
+        assert week[monday + timedelta(days=2)].available_slots == [time(9, 0)]
+        assert week[monday + timedelta(days=5)].start_time is None
+
+
+def test_availability_range_uses_bulk_queries(run_with_database):
+    run_with_database(_range_flow, name=None)
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import date, datetime, time, timedelta
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from database.database import load_engine_settings
+from database.models import Booking, Organization
+from utils.availability_cache import availability_cache
+from utils.booking_algorithm import set_schedule_for_day
+from utils.booking_service import BookingOutcome, book_slot, cancel_booking, create_booking
+
+DAY = date(2030, 3, 4)
+
+
+async def _prepare(session_factory):
+    availability_cache.clear()
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        await set_schedule_for_day(db, org.id, DAY.weekday(), time(16, 0), time(20, 0), 3, 60)
+    return org.id
+
+
+async def _concurrent_flow(engine, session_factory, read_first):
+    org_id = await _prepare(session_factory)
+
+    async def attempt(user_id):
+        async with session_factory() as db:
+            if read_first:
+                # Транзакция апдейта уже читала до book_slot
+                await db.get(Organization, org_id)
+            return await book_slot(db, org_id, user_id, f"Клиент {user_id}", DAY, time(17, 0))
+
+    results = await asyncio.gather(*(attempt(user_id) for user_id in range(1, 6)))
+    outcomes = [result.outcome for result in results]
+    assert outcomes.count(BookingOutcome.CREATED) == 1
+    assert set(outcomes) <= {BookingOutcome.CREATED, BookingOutcome.SLOT_TAKEN}
+
+    async with session_factory() as db:
+        active = await db.scalar(select(func.count()).select_from(Booking).where(Booking.booking_status == "active"))
+        assert active == 1
+        assert (await book_slot(db, org_id, 9, "Клиент", DAY, time(15, 0))).outcome is BookingOutcome.SLOT_UNAVAILABLE
+
+
+async def _unique_flow(engine, session_factory):
+    org_id = await _prepare(session_factory)
+    async with session_factory() as db:
+        booking_id = (await create_booking(db, org_id, 1, "Клиент", DAY, time(18, 0), time(19, 0))).id
+        with pytest.raises(IntegrityError):
+            await create_booking(db, org_id, 2, "Клиент", DAY, time(18, 0), time(19, 0))
+        await db.rollback()
+        # После отмены слот снова можно занять
+        assert await cancel_booking(db, booking_id, 1)
+        result = await book_slot(db, org_id, 2, "Клиент", DAY, time(18, 0))
+        assert result.ok and result.booking.end_time == time(19, 0)
+
+
+async def _past_slot_flow(engine, session_factory):
+    org_id = await _prepare(session_factory)
+    async with session_factory() as db:
+        # Устаревшая кнопка: прошедший день и прошедшее время сегодня
+        now = datetime.combine(DAY, time(17, 30))
+        for day, slot in ((DAY - timedelta(days=7), time(17, 0)), (DAY, time(17, 0))):
+            result = await book_slot(db, org_id, 1, "Клиент", day, slot, now=now)
+            assert result.outcome is BookingOutcome.SLOT_UNAVAILABLE
+        assert (await book_slot(db, org_id, 1, "Клиент", DAY, time(18, 0), now=now)).ok
+
+
+async def _other_integrity_error_flow(engine, session_factory):
+    org_id = await _prepare(session_factory)
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(
+            "CREATE TRIGGER reject_booking BEFORE INSERT ON bookings "
+            "BEGIN SELECT RAISE(ABORT, 'CHECK constraint failed: test'); END"
+        )
+    async with session_factory() as db:
+        # Чужое ограничение - не "слот занят", ошибка не должна теряться
+        with pytest.raises(IntegrityError):
+            await book_slot(db, org_id, 1, "Клиент", DAY, time(17, 0))
+
+
+def test_concurrent_bookings_of_one_slot(run_with_database):
+    # Движок с настройками бота: пул, WAL, busy_timeout и явный BEGIN
+    settings = load_engine_settings("prod", {})
+    for read_first in (False, True):
+        run_with_database(_concurrent_flow, read_first, name=f"bookings_{read_first}.db", settings=settings)
+
+
+def test_unique_active_slot_constraint(run_with_database):
+    run_with_database(_unique_flow)
+
+
+def test_past_slots_are_rejected(run_with_database):
+    run_with_database(_past_slot_flow)
+
+
+def test_book_slot_reraises_other_integrity_errors(run_with_database):
+    run_with_database(_other_integrity_error_flow)
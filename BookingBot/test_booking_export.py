@@ -0,0 +1,58 @@
+import csv
+import json
+import os
+from datetime import date, time, timedelta
+import pytest
+from sqlalchemy import insert
+from database.models import Booking, Organization
+from utils.booking_export import EXPORT_FIELDS, ExportTooLargeError, export_organization_bookings
+from utils.booking_service import stream_organization_bookings
+
+TOTAL = 2500
+
+
+async def _export_flow(engine, session_factory, tmp_dir):
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        await db.execute(insert(Booking), [
+            {
+                "organization_id": org.id,
+                "telegram_user_id": number,
+                "user_full_name": "=HYPERLINK(1)" if number == 1 else f'Клиент, "{number}"',
+                "booking_date": date(2020, 1, 1) + timedelta(days=number // 10),
+                "start_time": time(8 + number % 10),
+                "end_time": time(9 + number % 10),
+                "booking_status": "cancelled" if number % 3 else "active",
+            }
+            for number in range(TOTAL)
+        ])
+        await db.commit()
+
+        chunks = [len(chunk) async for chunk in stream_organization_bookings(db, org.id, chunk_size=1000)]
+        assert chunks == [1000, 1000, 500]
+        active = [row async for chunk in stream_organization_bookings(db, org.id, active_only=True) for row in chunk]
+        assert len(active) == len(range(0, TOTAL, 3))
+
+        csv_path = os.path.join(tmp_dir, "bookings.csv")
+        assert await export_organization_bookings(db, org.id, csv_path, "csv", chunk_size=700) == TOTAL
+        with open(csv_path, encoding="utf-8", newline="") as source:
+            rows = list(csv.DictReader(source))
+        assert len(rows) == TOTAL and list(rows[0]) == EXPORT_FIELDS
+        assert rows[0]["user_full_name"] == 'Клиент, "0"' and rows[0]["booking_date"] == "2020-01-01"
+        # Значение, похожее на формулу, Excel не выполнит
+        assert rows[1]["user_full_name"] == "'=HYPERLINK(1)"
+
+        with pytest.raises(ExportTooLargeError):
+            await export_organization_bookings(db, org.id, csv_path, "csv", chunk_size=700, max_bytes=10000)
+
+        jsonl_path = os.path.join(tmp_dir, "bookings.jsonl")
+        assert await export_organization_bookings(db, org.id, jsonl_path, "jsonl") == TOTAL
+        with open(jsonl_path, encoding="utf-8") as source:
+            records = [json.loads(line) for line in source]
+        assert records[-1]["start_time"] == "17:00:00" and records[-1]["booking_status"] == "active"
+
+
+def test_streaming_export(run_with_database, tmp_path):
+    run_with_database(_export_flow, str(tmp_path))
@@ -0,0 +1,65 @@
+from datetime import date, time, timedelta
+from sqlalchemy import insert
+from database.models import Booking, Organization
+from keyboards.callbacks import BookingsPageCallback
+from utils.booking_service import booking_cursor, get_organization_bookings_page, get_user_bookings_page
+
+TOTAL = 23
+
+
+async def _pagination_flow(engine, session_factory):
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        await db.execute(insert(Booking), [
+            {
+                "organization_id": org.id,
+                "telegram_user_id": 100,
+                "user_full_name": "Клиент",
+                "booking_date": date(2030, 1, 1) + timedelta(days=number // 4),
+                "start_time": time(10 + number % 4),
+                "end_time": time(11 + number % 4),
+                "booking_status": "active",
+            }
+            for number in range(TOTAL)
+        ] + [{
+            "organization_id": org.id, "telegram_user_id": 100, "user_full_name": "Клиент",
+            "booking_date": date(2030, 1, 1), "start_time": time(9), "end_time": time(10),
+            "booking_status": "cancelled",
+        }])
+        await db.commit()
+        expected = sorted(
+            (booking_cursor(booking) for booking in
+             (await db.execute(Booking.__table__.select().where(Booking.booking_status == "active"))).all())
+        )
+
+        # Вперёд до конца
+        seen, pages, page = [], 0, await get_organization_bookings_page(db, org.id, limit=5)
+        assert page.prev_cursor is None
+        while True:
+            pages += 1
+            seen += [booking_cursor(booking) for booking in page.bookings]
+            if page.next_cursor is None:
+                break
+            # Курсор проходит через callback_data без потерь
+            cursor = BookingsPageCallback.unpack(BookingsPageCallback.build("o", "n", page.next_cursor).pack()).cursor
+            page = await get_organization_bookings_page(db, org.id, after=cursor, limit=5)
+        assert seen == expected and pages == 5
+        assert len(page.bookings) == 3 and page.prev_cursor is not None
+
+        # Назад до начала
+        back = []
+        while page.prev_cursor is not None:
+            page = await get_organization_bookings_page(db, org.id, before=page.prev_cursor, limit=5)
+            assert len(page.bookings) == 5 and page.next_cursor is not None
+            back = [booking_cursor(booking) for booking in page.bookings] + back
+        assert back == expected[:20]
+
+        user_page = await get_user_bookings_page(db, 100, limit=100)
+        assert len(user_page.bookings) == 23 and user_page.next_cursor is None
+        assert (await get_user_bookings_page(db, 555)).bookings == []
+
+
+def test_keyset_pagination_both_directions(run_with_database):
+    run_with_database(_pagination_flow)
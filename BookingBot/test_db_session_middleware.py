@@ -0,0 +1,50 @@
+from datetime import date, time
+import pytest
+from sqlalchemy import func, select
+from database.database import EngineSettings
+from database.models import Booking, Organization
+from middlewares import DbSessionMiddleware
+from utils.availability_cache import DayAvailability, availability_cache
+from utils.booking_algorithm import set_schedule_for_day
+from utils.booking_service import book_slot
+
+DAY = date(2030, 3, 4)
+
+
+async def _middleware_flow(engine, session_factory):
+    availability_cache.clear()
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        await set_schedule_for_day(db, org.id, DAY.weekday(), time(16, 0), time(20, 0), 3, 60)
+    middleware = DbSessionMiddleware(session_factory)
+    placeholder = DayAvailability(time(16, 0), time(20, 0), 3, 60, [])
+
+    async def handler(event, data):
+        db = data["db"]
+        result = await book_slot(db, org.id, event, "Клиент", DAY, time(17, 0))
+        # До фиксации транзакции кэш не сбрасывается
+        assert availability_cache.get(org.id, DAY) is placeholder
+        if event == 2:
+            raise RuntimeError("ошибка хендлера")
+        return result.outcome
+
+    availability_cache.set(org.id, DAY, placeholder)
+    with pytest.raises(RuntimeError):
+        await middleware(handler, 2, {})
+    # Откат: брони нет, кэш не тронут
+    assert availability_cache.get(org.id, DAY) is placeholder
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(Booking)) == 0
+
+    assert (await middleware(handler, 1, {})).value == "created"
+    assert availability_cache.get(org.id, DAY) is None
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(Booking)) == 1
+    # Все соединения вернулись в пул
+    assert engine.pool.checkedout() == 0
+
+
+def test_session_per_update_commits_once(run_with_database):
+    run_with_database(_middleware_flow, settings=EngineSettings())
@@ -0,0 +1,36 @@
+import asyncio
+import os
+import tempfile
+import pytest
+from sqlalchemy import text
+from database.database import ENGINE_PROFILES, create_engine_from_settings, load_engine_settings
+
+
+def test_profiles_and_env_overrides():
+    assert load_engine_settings(environ={}).echo is False
+    dev = load_engine_settings(environ={"DB_PROFILE": "dev"})
+    assert dev == ENGINE_PROFILES["dev"] and dev.echo is True
+    settings = load_engine_settings(environ={"DB_POOL_SIZE": "3", "DB_ECHO": "debug", "DB_POOL_PRE_PING": "0"})
+    assert (settings.pool_size, settings.echo, settings.pool_pre_ping) == (3, "debug", False)
+    with pytest.raises(ValueError):
+        load_engine_settings(environ={"DB_PROFILE": "staging"})
+
+
+async def _pragmas(url, settings):
+    engine = create_engine_from_settings(url, settings)
+    async with engine.connect() as conn:
+        values = [
+            (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout")
+        ]
+    await engine.dispose()
+    return values
+
+
+def test_sqlite_pragmas_applied():
+    settings = load_engine_settings(environ={"SQLITE_BUSY_TIMEOUT_MS": "1234"})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'bot.db')}"
+        assert asyncio.run(_pragmas(url, settings)) == ["wal", 1, 1234]
+    # Для базы в памяти настройки пула не передаются
+    assert asyncio.run(_pragmas("sqlite+aiosqlite://", settings))[2] == 1234
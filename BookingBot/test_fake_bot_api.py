@@ -0,0 +1,84 @@
+import asyncio
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from bench_load import UpdateMetrics, instrument, percentile
+from fake_bot_api import FakeBotAPI
+
+USER = {"id": 777, "is_bot": False, "first_name": "Клиент"}
+
+
+def _router() -> Router:
+    router = Router()
+
+    @router.message(Command("start"))
+    async def cmd_start(message: Message):
+        await message.answer("Выберите:", reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="Да", callback_data="yes"), InlineKeyboardButton(text="Нет", callback_data="no")]
+        ]))
+
+    @router.callback_query(F.data == "yes")
+    async def press_yes(callback: CallbackQuery):
+        await callback.message.edit_text("Готово")
+        await callback.answer()
+
+    @router.callback_query(F.data == "no")
+    async def press_no(callback: CallbackQuery):
+        await callback.answer("Отказ", show_alert=True)
+
+    return router
+
+
+async def _flow():
+    api = FakeBotAPI()
+    await api.start()
+    bot = Bot("123456:TEST", session=AiohttpSession(api=TelegramAPIServer.from_base(api.url)))
+    dp = Dispatcher()
+    dp.include_router(_router())
+    metrics = UpdateMetrics()
+    instrument(dp, metrics)
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    try:
+        await asyncio.wait_for(api.polling_started.wait(), 5)
+        events = api.chat_events(USER["id"])
+
+        api.push_message(USER, "/start")
+        reply = await asyncio.wait_for(events.get(), 5)
+        assert reply.kind == "message" and reply.payload["text"] == "Выберите:"
+        buttons = reply.payload["reply_markup"]["inline_keyboard"][0]
+        assert [button["callback_data"] for button in buttons] == ["yes", "no"]
+
+        update = api.push_callback(USER, reply.payload, "yes")
+        edited = await asyncio.wait_for(events.get(), 5)
+        assert edited.kind == "message" and edited.payload["text"] == "Готово"
+        assert edited.payload["message_id"] == reply.payload["message_id"]
+        answer = await asyncio.wait_for(events.get(), 5)
+        assert answer == ("callback_answer", {"text": None, "show_alert": False})
+        await metrics.wait_processed(update["update_id"], 5)
+
+        update = api.push_callback(USER, reply.payload, "no")
+        answer = await asyncio.wait_for(events.get(), 5)
+        assert answer == ("callback_answer", {"text": "Отказ", "show_alert": True})
+        await metrics.wait_processed(update["update_id"], 5)
+    finally:
+        await dp.stop_polling()
+        await polling
+        await api.stop()
+    return metrics, api
+
+
+def test_fake_api_round_trip_and_metrics():
+    metrics, api = asyncio.run(_flow())
+    assert {name: len(values) for name, values in metrics.latencies.items()} == {
+        "cmd_start": 1, "press_yes": 1, "press_no": 1
+    }
+    assert api.calls["sendmessage"] == 1 and api.calls["answercallbackquery"] == 2
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([5], 95) == 5
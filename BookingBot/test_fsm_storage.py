@@ -0,0 +1,83 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import func, select, update
+from database.models import FsmRecord
+from utils.fsm_storage import SQLAlchemyStorage, build_storage_key
+from utils.states import BookingByCode
+
+KEY = StorageKey(bot_id=42, chat_id=100, user_id=100)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _storage_flow(engine, session_factory):
+    clock = FakeClock()
+    worker_a = SQLAlchemyStorage(session_factory, cache_ttl_seconds=5, clock=clock)
+    worker_b = SQLAlchemyStorage(session_factory, cache_ttl_seconds=5, clock=clock)
+
+    assert await worker_a.get_state(KEY) is None
+    await worker_a.set_state(KEY, BookingByCode.waiting_for_org_code)
+    await worker_a.set_data(KEY, {"organization_id": 7, "name": "Тест"})
+    # Другой процесс видит состояние и данные
+    assert await worker_b.get_state(KEY) == BookingByCode.waiting_for_org_code.state
+    assert await worker_b.get_data(KEY) == {"organization_id": 7, "name": "Тест"}
+    # Запись состояния не затирает данные
+    await worker_b.set_state(KEY, None)
+    assert await worker_b.get_data(KEY) == {"organization_id": 7, "name": "Тест"}
+
+    # worker_a читает из локального кэша, пока не истёк cache_ttl_seconds
+    assert await worker_a.get_state(KEY) == BookingByCode.waiting_for_org_code.state
+    clock.now = 5
+    assert await worker_a.get_state(KEY) is None
+
+    # Брошенный диалог читается как пустой и удаляется
+    async with session_factory() as db:
+        await db.execute(update(FsmRecord).values(updated_at=datetime.utcnow() - timedelta(days=2)))
+        await db.commit()
+    clock.now = 10
+    assert await worker_a.get_data(KEY) == {}
+    await worker_a.set_state(KEY, BookingByCode.waiting_for_org_code)
+    clock.now = 20
+    assert await worker_b.get_data(KEY) == {}
+
+    other = StorageKey(bot_id=42, chat_id=200, user_id=200)
+    await worker_a.set_data(other, {"step": 1})
+    async with session_factory() as db:
+        await db.execute(update(FsmRecord).where(FsmRecord.storage_key == "42:200:200:default").values(
+            updated_at=datetime.utcnow() - timedelta(days=2)
+        ))
+        await db.commit()
+    assert await worker_a.purge_expired() == 1
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count()).select_from(FsmRecord)) == 1
+
+
+async def _default_cache_flow(engine, session_factory):
+    worker_a = SQLAlchemyStorage(session_factory)
+    worker_b = SQLAlchemyStorage(session_factory)
+    # B обработал /start, A - /code; следующее сообщение снова попадает к B
+    assert await worker_b.get_state(KEY) is None
+    await worker_a.set_state(KEY, BookingByCode.waiting_for_org_code)
+    assert await worker_b.get_state(KEY) == BookingByCode.waiting_for_org_code.state
+
+
+def test_default_storage_sees_other_workers_writes(run_with_database):
+    run_with_database(_default_cache_flow)
+
+
+def test_sql_fsm_storage_shared_between_workers(run_with_database):
+    run_with_database(_storage_flow)
+
+
+def test_storage_key_without_business_connection():
+    # StorageKey в aiogram до 3.5 не имеет поля business_connection_id
+    LegacyKey = namedtuple("LegacyKey", "bot_id chat_id user_id thread_id destiny")
+    assert build_storage_key(LegacyKey(42, 100, 100, None, "default")) == "42:100:100:default"
+    assert build_storage_key(KEY) == "42:100:100:default"
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+from datetime import date, time
+from journal_store import JournalStore
+from simple_bot_demo import SimpleBookingBot
+
+
+def test_journal_replay_and_compaction():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot = os.path.join(tmp_dir, "data.json")
+        store = JournalStore(snapshot, compact_every=0, default={"bookings": {}})
+        store.load()
+        for number in range(1, 4):
+            store.set(("bookings", number), {"id": str(number)})
+        store.set(("organizations", "1", "schedules", "0"), {"start_time": "09:00"})
+        store.close()
+        assert not os.path.exists(snapshot)
+
+        # Сбой посреди записи: последняя строка недописана
+        with open(store.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"path": ["bookings", "4"], "val')
+        store = JournalStore(snapshot, compact_every=0)
+        data = store.load()
+        assert sorted(data["bookings"]) == ["1", "2", "3"]
+        assert data["organizations"]["1"]["schedules"]["0"] == {"start_time": "09:00"}
+        store.set(("bookings", "4"), {"id": "4"})
+        store.compact()
+        store.close()
+        assert os.path.getsize(store.journal_path) == 0
+        with open(snapshot, encoding="utf-8") as f:
+            assert sorted(json.load(f)["bookings"]) == ["1", "2", "3", "4"]
+
+        # Автоматическое сворачивание
+        store = JournalStore(snapshot, compact_every=2)
+        store.load()
+        store.set(("bookings", "5"), {"id": "5"})
+        store.set(("bookings", "6"), {"id": "6"})
+        assert os.path.getsize(store.journal_path) == 0
+        store.close()
+        assert sorted(JournalStore(snapshot).load()["bookings"]) == ["1", "2", "3", "4", "5", "6"]
+
+
+def test_simple_bot_persists_through_journal():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = os.path.join(tmp_dir, "booking_data.json")
+        bot = SimpleBookingBot(data_file)
+        code = bot.create_organization("42", "Тест", "Адрес", "Контакты", "Описание")
+        org_id = bot.get_organization_by_code(code)["id"]
+        bot.set_schedule_for_day(org_id, 0, "09:00", "12:00", 2, 60)
+        bot.create_booking(org_id, "7", "Клиент", date(2030, 1, 7), time(9), time(10))
+        bot.close()
+
+        reopened = SimpleBookingBot(data_file)
+        assert reopened.get_organization_by_code(code)["schedules"]["0"]["end_time"] == "12:00"
+        assert reopened.get_booked_slots_for_date(org_id, date(2030, 1, 7)) == [time(9)]
+        reopened.close()
@@ -0,0 +1,56 @@
+from datetime import date, time
+from keyboards.callbacks import DateCallback, DatesCallback, SlotCallback, to_base36
+from keyboards.main import get_admin_keyboard, get_date_selection_keyboard, get_main_keyboard, get_time_slot_keyboard
+
+DAY = date(2026, 10, 18)
+
+
+def _texts(markup):
+    return [button.text for row in markup.inline_keyboard for button in row]
+
+
+def test_static_keyboards_are_shared():
+    assert get_main_keyboard() is get_main_keyboard()
+    assert get_admin_keyboard() is get_admin_keyboard()
+
+
+def test_time_slot_keyboard_is_memoized():
+    slots = [time(9, 0), time(10, 30), time(14, 0)]
+    markup = get_time_slot_keyboard(7, DAY, slots)
+    assert get_time_slot_keyboard(7, DAY, tuple(slots)) is markup
+    assert _texts(markup) == ["09:00", "10:30", "14:00", "🔙 Назад"]
+    assert [SlotCallback.unpack(button.callback_data).time for button in markup.inline_keyboard[0]] == slots
+    assert get_time_slot_keyboard(7, DAY, slots[:2]) is not markup
+    assert get_time_slot_keyboard(8, DAY, slots) is not markup
+
+
+def test_callback_data_round_trip():
+    packed = SlotCallback.build(123456789, DAY, time(23, 45)).pack()
+    assert len(packed.encode()) <= 64
+    slot = SlotCallback.unpack(packed)
+    assert (slot.organization_id, slot.date, slot.time) == (123456789, DAY, time(23, 45))
+    assert DateCallback.unpack(DateCallback.build(5, DAY).pack()).date == DAY
+    assert DatesCallback.unpack(DatesCallback.build(5).pack()).organization_id == 5
+
+    markup = get_date_selection_keyboard(5)
+    first = DateCallback.unpack(markup.inline_keyboard[0][0].callback_data)
+    assert first.organization_id == 5
+
+
+def test_forged_callback_data_is_rejected():
+    packed = SlotCallback.build(5, DAY, time(10, 0)).pack()
+    prefix, org, day, slot, sig = packed.split(":")
+    forged = SlotCallback.unpack(":".join((prefix, "6", day, slot, sig)))
+    assert forged.organization_id is None
+    assert SlotCallback.unpack(":".join((prefix, org, day, "u0", sig))).organization_id is None
+    assert DatesCallback.unpack("b:6:" + DatesCallback.build(5).sig).organization_id is None
+    assert DateCallback.unpack(DateCallback.build(5, DAY).pack().replace("d:5:", "d:6:")).organization_id is None
+
+
+def test_malformed_callback_data_gives_none():
+    slot = SlotCallback(org="5", day="sd", slot="100", sig="x")  # 1296 минут - ещё в сутках
+    assert slot.time == time(21, 36)
+    assert SlotCallback(org="5", day="sd", slot=to_base36(24 * 60), sig="x").time is None
+    assert SlotCallback(org="zz!", day="s-d", slot="", sig="x").date is None
+    assert SlotCallback(org="zz!", day="sd", slot="o6", sig="x").organization_id is None
+    assert DateCallback(org="5", day="zzzzzzzzzz", sig="x").date is None
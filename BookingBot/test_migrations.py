@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine, inspect
+from database.database import Base
+from database.migrations import ensure_indexes
+import database.models  # noqa: F401
+
+
+def test_ensure_indexes_upgrades_existing_database():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        bookings = Base.metadata.tables["bookings"]
+        for index in list(bookings.indexes):
+            if index.name in ("ix_bookings_org_date_status", "uq_bookings_active_slot"):
+                index.drop(conn)
+        conn.exec_driver_sql("DROP INDEX ix_organizations_admin_telegram_id")
+
+        created = ensure_indexes(conn)
+        assert sorted(created) == [
+            "ix_bookings_org_date_status", "ix_organizations_admin_telegram_id", "uq_bookings_active_slot"
+        ]
+        names = {index["name"] for index in inspect(conn).get_indexes("bookings")}
+        assert {"ix_bookings_org_date_status", "uq_bookings_active_slot"} <= names
+        assert ensure_indexes(conn) == []
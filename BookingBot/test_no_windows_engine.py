@@ -0,0 +1,44 @@
+import random
+from datetime import time
+from utils.booking_algorithm import generate_time_slots, get_available_slots_no_windows
+
+
+def _random_case(rng):
+    duration = rng.choice([15, 30, 45, 60, 90])
+    start = time(rng.randint(8, 12), rng.choice([0, 30]))
+    slots = generate_time_slots(start, time(23, 0), duration)[:rng.randint(1, 9)]
+    booked = rng.sample(slots, rng.randint(0, min(3, len(slots))))
+    if rng.random() < 0.2:
+        # Бронь вне сетки (например, после смены расписания)
+        booked.append(time(rng.randint(7, 22), rng.choice([0, 20, 40])))
+    if booked and rng.random() < 0.1:
+        booked.append(booked[0])
+    return slots, rng.randint(1, 6), booked
+
+
+def test_interval_engine_matches_reference():
+    """Интервальный алгоритм должен совпадать с переборным на случайных расписаниях"""
+    rng = random.Random(20240601)
+    for _ in range(1500):
+        slots, max_sessions, booked = _random_case(rng)
+        expected = get_available_slots_no_windows(slots, max_sessions, booked, use_reference=True)
+        actual = get_available_slots_no_windows(slots, max_sessions, booked)
+        assert actual == expected, (slots, max_sessions, booked)
+
+
+def test_interval_engine_examples():
+    slots = generate_time_slots(time(16, 0), time(20, 0), 60)
+    assert get_available_slots_no_windows(slots, 3, []) == slots
+    assert get_available_slots_no_windows(slots, 3, [time(17, 0)]) == [time(16, 0), time(18, 0), time(19, 0)]
+    assert get_available_slots_no_windows(slots, 3, [time(16, 0), time(17, 0), time(18, 0)]) == []
+
+
+def test_interval_engine_large_day():
+    """12-часовой день с 15-минутными слотами считается без перебора комбинаций"""
+    slots = generate_time_slots(time(8, 0), time(20, 0), 15)
+    booked = [time(12, 0), time(12, 15)]
+    available = get_available_slots_no_windows(slots, 4, booked)
+    assert time(11, 0) in available
+    assert time(10, 0) in available  # окно закрывается одним слотом 11:00
+    assert time(9, 0) not in available
+    assert available == get_available_slots_no_windows(slots, 4, booked, use_reference=True)
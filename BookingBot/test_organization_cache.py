@@ -0,0 +1,79 @@
+from sqlalchemy import event
+from handlers.admin_handlers import is_organization_admin
+from utils.booking_algorithm import create_organization, get_organization_by_admin_id, get_organization_by_unique_code
+from utils.organization_cache import AttemptLimiter, OrganizationDirectory, organization_directory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _directory_flow(engine, session_factory):
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    try:
+        organization_directory.clear()
+        async with session_factory() as db:
+            await organization_directory.load(db)
+            org = await create_organization(db, "Тест", "Адрес", "Контакты", "Описание", 1)
+            code = org.unique_code
+
+        async with session_factory() as db:
+            statements.clear()
+            # Код новой организации уже в карте: остаётся только выборка по первичному ключу
+            found = await get_organization_by_unique_code(db, f" {code} ")
+            assert found.id == org.id
+            assert len(statements) == 1
+
+            statements.clear()
+            for _ in range(5):
+                assert await get_organization_by_unique_code(db, "garbage") is None
+            assert await get_organization_by_unique_code(db, "x" * 1000) is None
+            assert await get_organization_by_unique_code(db, "") is None
+            # Неизвестный код проверяется в БД один раз
+            assert len(statements) == 1
+
+            statements.clear()
+            assert await is_organization_admin(db, 1)
+            assert (await get_organization_by_admin_id(db, 1)).id == org.id
+            for _ in range(3):
+                assert not await is_organization_admin(db, 500)
+            # Администратор известен после create_organization, клиент проверяется один раз
+            assert sum("FROM organizations" in statement for statement in statements) == 1
+    finally:
+        organization_directory.clear()
+
+
+def test_code_and_admin_lookups_use_directory(run_with_database):
+    run_with_database(_directory_flow)
+
+
+async def _admin_expiry_flow(engine, session_factory):
+    clock = FakeClock()
+    directory = OrganizationDirectory(negative_ttl_seconds=60, clock=clock)
+    # Организация, которой в базе уже нет (удалена другим процессом)
+    directory.register("gone", 99, admin_telegram_id=1)
+    async with session_factory() as db:
+        assert await directory.resolve_admin(db, 1) == 99
+        clock.now = 61
+        assert await directory.resolve_admin(db, 1) is None
+
+
+def test_admin_entries_expire(run_with_database):
+    run_with_database(_admin_expiry_flow, name=None)
+
+
+def test_attempt_limiter_sliding_window():
+    clock = FakeClock()
+    limiter = AttemptLimiter(max_attempts=3, period_seconds=60, clock=clock)
+    assert [limiter.allow(1) for _ in range(4)] == [True, True, True, False]
+    assert limiter.allow(2)
+    clock.now = 59
+    assert not limiter.allow(1)
+    clock.now = 60
+    assert limiter.allow(1)
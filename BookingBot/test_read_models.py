@@ -0,0 +1,34 @@
+from datetime import date, time
+from database.models import Booking, Organization, User
+from database.read_models import BookingView, OrganizationView, UserView
+from utils.booking_service import (
+    get_organization_bookings, get_organization_by_id, get_organization_users, get_user_bookings
+)
+
+
+async def _views_flow(engine, session_factory):
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1, unique_code="abc")
+        db.add(org)
+        await db.flush()
+        db.add(User(telegram_id=100, full_name="Клиент", organization_id=org.id, role="client"))
+        db.add(Booking(organization_id=org.id, telegram_user_id=100, user_full_name="Клиент",
+                       booking_date=date(2030, 1, 1), start_time=time(10), end_time=time(11),
+                       booking_status="active"))
+        await db.commit()
+
+    async with session_factory() as db:
+        bookings = await get_user_bookings(db, 100)
+        assert bookings == await get_organization_bookings(db, org.id)
+        assert isinstance(bookings[0], BookingView) and bookings[0].start_time == time(10)
+        users = await get_organization_users(db, org.id)
+        assert users == [UserView(users[0].id, 100, "Клиент", None, "client")]
+        organization = await get_organization_by_id(db, org.id)
+        assert isinstance(organization, OrganizationView) and organization.unique_code == "abc"
+        assert await get_organization_by_id(db, org.id + 1) is None
+        # Модели чтения не попадают в identity map сессии
+        assert len(db.identity_map) == 0
+
+
+def test_display_paths_return_read_models(run_with_database):
+    run_with_database(_views_flow)
@@ -0,0 +1,94 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import event, update
+from database.models import Organization, Schedule
+from utils.booking_algorithm import (
+    get_effective_schedule,
+    get_schedule_for_date,
+    get_schedules_for_dates,
+    set_schedule_for_day,
+    set_specific_date
+)
+from utils.schedule_store import ScheduleStore, schedule_store
+
+MONDAY = date(2025, 3, 3)
+
+
+async def _setup(session_factory):
+    async with session_factory() as db:
+        first = Organization(name="Первая", admin_telegram_id=1)
+        second = Organization(name="Вторая", admin_telegram_id=2)
+        db.add_all([first, second])
+        await db.commit()
+        await set_schedule_for_day(db, first.id, 0, time(9, 0), time(12, 0), 3, 30)
+        await set_schedule_for_day(db, second.id, 1, time(14, 0), time(18, 0), 2, 60)
+        await set_specific_date(db, first.id, MONDAY + timedelta(days=7), time(10, 0), time(11, 0))
+    return first.id, second.id
+
+
+async def _resolution_flow(engine, session_factory):
+    first, second = await _setup(session_factory)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    async with session_factory() as db:
+        assert await get_schedule_for_date(db, first, MONDAY) == (time(9, 0), time(12, 0), 3, 30)
+        assert await get_schedule_for_date(db, first, MONDAY + timedelta(days=7)) == (time(10, 0), time(11, 0), 1, 60)
+        assert await get_schedule_for_date(db, second, MONDAY) == (None, None, None, None)
+        assert len(statements) == 3
+
+        keys = [(organization_id, MONDAY + timedelta(days=offset))
+                for organization_id in (first, second) for offset in range(10)]
+        statements.clear()
+        batch = await get_schedules_for_dates(db, keys)
+        assert len(statements) == 1
+        for organization_id, day in keys:
+            assert batch[(organization_id, day)] == await get_schedule_for_date(db, organization_id, day)
+
+
+def test_schedule_resolved_in_one_query(run_with_database):
+    run_with_database(_resolution_flow, name=None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _store_flow(engine, session_factory):
+    first, second = await _setup(session_factory)
+    schedule_store.invalidate()
+    next_monday = date.today() + timedelta(days=7 - date.today().weekday())
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    async with session_factory() as db:
+        assert await get_effective_schedule(db, first, next_monday) == (time(9, 0), time(12, 0), 3, 30)
+        statements.clear()
+        for offset in range(14):
+            day = next_monday + timedelta(days=offset)
+            assert await get_effective_schedule(db, second, day) == await get_schedule_for_date(db, second, day)
+        assert len(statements) == 2 + 14  # загрузка снимка и эталонные запросы
+
+        # Изменение через set_schedule_for_day сбрасывает снимок
+        await set_schedule_for_day(db, first, 0, time(8, 0), time(12, 0), 4, 60)
+        assert await get_effective_schedule(db, first, next_monday) == (time(8, 0), time(12, 0), 4, 60)
+
+    clock = FakeClock()
+    store = ScheduleStore(version_check_interval=60, clock=clock)
+    async with session_factory() as db:
+        await store.snapshot(db, second)
+    # Изменение из другого процесса видно после проверки версии
+    async with session_factory() as db:
+        await db.execute(update(Schedule).where(Schedule.organization_id == second).values(
+            max_sessions_per_day=5, updated_at=datetime.utcnow() + timedelta(seconds=1)))
+        await db.commit()
+    async with session_factory() as db:
+        tuesday = next_monday + timedelta(days=1)
+        assert (await store.snapshot(db, second)).resolve(tuesday)[2] == 2
+        clock.now = 61
+        assert (await store.snapshot(db, second)).resolve(tuesday)[2] == 5
+
+
+def test_schedule_store_serves_from_memory(run_with_database):
+    run_with_database(_store_flow, name=None)
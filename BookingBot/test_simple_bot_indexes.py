@@ -0,0 +1,40 @@
+import os
+import tempfile
+from datetime import date, time, timedelta
+from simple_bot_demo import SimpleBookingBot
+
+
+def _scan_booked(bot, org_id, day):
+    day_str = day.strftime('%Y-%m-%d')
+    return sorted(
+        booking['start_time'] for booking in bot.data['bookings'].values()
+        if booking['organization_id'] == org_id and booking['booking_date'] == day_str
+    )
+
+
+def test_indexes_match_full_scans_after_reload():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_file = os.path.join(tmp_dir, "booking_data.json")
+        bot = SimpleBookingBot(data_file)
+        codes = [bot.create_organization(str(admin), f"Орг {admin}", "", "", "") for admin in (1, 2)]
+        org_ids = [bot.get_organization_by_code(code)['id'] for code in codes]
+        first_day = date(2030, 1, 1)
+        for number in range(200):
+            org_id = org_ids[number % 2]
+            start = time(9 + number % 8)
+            bot.create_booking(org_id, str(number % 5), "Клиент", first_day + timedelta(days=number // 16),
+                               start, time(10 + number % 8))
+        bot.close()
+
+        for current in (bot, SimpleBookingBot(data_file)):
+            assert current.get_organization_by_code("нет такого") is None
+            assert current.get_organization_by_admin(2)['id'] == org_ids[1]
+            assert current.get_organization_by_admin("3") is None
+            for org_id in org_ids:
+                for offset in range(14):
+                    day = first_day + timedelta(days=offset)
+                    booked = current.get_booked_slots_for_date(org_id, day)
+                    assert sorted(slot.strftime('%H:%M') for slot in booked) == _scan_booked(current, org_id, day)
+            assert len(current.get_user_bookings("3")) == 40
+            assert {booking['user_id'] for booking in current.get_user_bookings(3)} == {"3"}
+        current.close()
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+import pytest
+from datetime import date, time, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from database.database import Base
+from database.models import Organization
+from simple_bot_demo import JsonSlotRepository, SimpleBookingBot
+from utils.availability_cache import availability_cache
+from utils.booking_algorithm import SqlSlotRepository, set_schedule_for_day, set_specific_date
+from utils.booking_service import create_booking
+from utils.slot_engine import SlotRepository, compute_availability, compute_day_availability
+
+FIRST_DAY = date(2030, 1, 7)  # понедельник
+DAYS = [FIRST_DAY + timedelta(days=offset) for offset in range(7)]
+WEEKLY = [(0, "16:00", "20:00", 3, 60), (2, "09:00", "13:00", 4, 30), (4, "10:00", "18:00", 2, 90)]
+SPECIFIC = [(FIRST_DAY + timedelta(days=1), "12:00", "15:00", None)]
+BOOKINGS = [(0, "17:00", "18:00"), (2, "10:00", "10:30"), (2, "11:00", "11:30"), (4, "11:30", "13:00")]
+
+
+def _time(value):
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+
+async def _sql_availability(engine, session_factory):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    availability_cache.clear()
+    async with session_factory() as db:
+        org = Organization(name="Тест", admin_telegram_id=1)
+        db.add(org)
+        await db.commit()
+        for day_of_week, start, end, max_sessions, duration in WEEKLY:
+            await set_schedule_for_day(db, org.id, day_of_week, _time(start), _time(end), max_sessions, duration)
+        for day, start, end, max_sessions in SPECIFIC:
+            await set_specific_date(db, org.id, day, _time(start), _time(end), max_sessions)
+        for offset, start, end in BOOKINGS:
+            await create_booking(db, org.id, 42, "Клиент", FIRST_DAY + timedelta(days=offset),
+                                 _time(start), _time(end))
+        repository = SqlSlotRepository(db)
+        by_day = {day: await compute_day_availability(repository, org.id, day) for day in DAYS}
+        assert await compute_availability(repository, org.id, DAYS) == by_day
+        return by_day
+
+
+def test_sql_and_json_repositories_agree(run_with_database):
+    sql_result = run_with_database(_sql_availability, name=None)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bot = SimpleBookingBot(os.path.join(tmp_dir, "booking_data.json"))
+        org_id = bot.get_organization_by_code(bot.create_organization("1", "Тест", "", "", ""))['id']
+        for day_of_week, start, end, max_sessions, duration in WEEKLY:
+            bot.set_schedule_for_day(org_id, day_of_week, start, end, max_sessions, duration)
+        for day, start, end, max_sessions in SPECIFIC:
+            bot.set_specific_date_schedule(org_id, day.strftime('%Y-%m-%d'), start, end, max_sessions)
+        for offset, start, end in BOOKINGS:
+            bot.create_booking(org_id, "42", "Клиент", FIRST_DAY + timedelta(days=offset), _time(start), _time(end))
+
+        json_result = asyncio.run(compute_availability(JsonSlotRepository(bot), org_id, DAYS))
+        assert {day: bot.get_day_availability(org_id, day) for day in DAYS} == json_result
+        bot.close()
+
+    assert json_result == sql_result
+    assert sql_result[FIRST_DAY].available_slots == [time(16, 0), time(18, 0), time(19, 0)]
+    assert sql_result[FIRST_DAY + timedelta(days=1)].max_sessions == 1
+    assert sql_result[FIRST_DAY + timedelta(days=3)].start_time is None
+
+
+def test_json_repository_ignores_inactive_bookings():
+    with pytest.raises(TypeError):
+        SlotRepository()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "booking_data.json")
+        bot = SimpleBookingBot(path)
+        org_id = bot.get_organization_by_code(bot.create_organization("1", "Тест", "", "", ""))['id']
+        booking_id = bot.create_booking(org_id, "42", "Клиент", FIRST_DAY, time(17), time(18))
+        bot.store.set(('bookings', booking_id, 'booking_status'), 'cancelled')
+        bot.close()
+
+        reopened = SimpleBookingBot(path)
+        assert asyncio.run(JsonSlotRepository(reopened).get_booked_slots(org_id, FIRST_DAY)) == []
+        assert [booking['id'] for booking in reopened.get_user_bookings("42")] == [booking_id]
+        reopened.close()
@@ -0,0 +1,60 @@
+import random
+from datetime import time
+from utils.booking_algorithm import (
+    generate_time_slots,
+    get_available_slots_for_day,
+    get_available_slots_no_windows,
+    has_window_in_combination
+)
+from utils.slot_mask import DayGrid, mask_has_window, safe_slots_mask
+
+
+def test_day_grid_round_trip():
+    grid = DayGrid(time(9, 0), time(12, 0), 30)
+    assert grid.size == 6
+    assert grid.to_times() == generate_time_slots(time(9, 0), time(12, 0), 30)
+    mask, off_grid = grid.to_mask([time(9, 30), time(11, 0), time(9, 45)])
+    assert mask == 0b010010
+    assert off_grid == [time(9, 45)]
+    assert grid.to_times(mask) == [time(9, 30), time(11, 0)]
+
+
+def test_mask_has_window_matches_time_lists():
+    rng = random.Random(7)
+    for duration in (15, 30, 60, 90):
+        grid = DayGrid(time(8, 0), time(20, 0), duration)
+        for _ in range(300):
+            mask = rng.getrandbits(grid.size)
+            combination = grid.to_times(mask)
+            assert mask_has_window(mask, grid.max_step) == has_window_in_combination(combination)
+
+
+def test_safe_slots_mask_examples():
+    # 16:00-20:00, занят 17:00 (бит 1), лимит 3
+    assert safe_slots_mask(0b1101, 0b0010, 3) == 0b1101
+    # 17:00 и 18:00 заняты - доступны 16:00 и 19:00
+    assert safe_slots_mask(0b1001, 0b0110, 3) == 0b1001
+    # Заблокированный слот внутри блока броней делает день недоступным
+    assert safe_slots_mask(0b11010, 0b100001, 6) == 0
+
+
+def test_mask_engine_matches_reference():
+    """Расчёт на масках совпадает с переборным алгоритмом, включая заблокированные слоты"""
+    rng = random.Random(20240602)
+    for _ in range(1500):
+        duration = rng.choice([15, 30, 45, 60, 90])
+        start = time(rng.randint(8, 12), 0)
+        day = generate_time_slots(start, time(23, 0), duration)
+        end = day[min(rng.randint(1, 9), len(day) - 1)]
+        slots = generate_time_slots(start, end, duration)
+        booked = rng.sample(slots, rng.randint(0, min(3, len(slots))))
+        blocked = [slot for slot in slots if slot not in booked and rng.random() < 0.15]
+        if booked and rng.random() < 0.1:
+            booked.append(booked[0])
+        if rng.random() < 0.1:
+            booked.append(time(rng.randint(7, 22), 20))
+        max_sessions = rng.randint(1, 6)
+        available = [slot for slot in slots if slot not in blocked]
+        expected = get_available_slots_no_windows(available, max_sessions, booked, use_reference=True)
+        actual = get_available_slots_for_day(start, end, max_sessions, duration, booked, blocked)
+        assert actual == expected, (start, end, duration, max_sessions, booked, blocked)
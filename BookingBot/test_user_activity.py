@@ -0,0 +1,43 @@
+from datetime import datetime
+from sqlalchemy import func, select
+from database.models import Organization, User
+from utils.booking_service import register_user_if_not_exists
+from utils.user_activity import InteractionBuffer, interaction_buffer
+
+
+async def _activity_flow(engine, session_factory):
+    try:
+        async with session_factory() as db:
+            org = Organization(name="Тест", admin_telegram_id=1)
+            db.add(org)
+            await db.commit()
+
+            # Повторная регистрация не создаёт дублей даже без кэша известных пользователей
+            for _ in range(3):
+                interaction_buffer._known_users.clear()
+                await register_user_if_not_exists(db, 100, "Клиент", org.id)
+            assert await db.scalar(select(func.count()).select_from(User)) == 1
+
+            # Известный пользователь только попадает в буфер, без обращения к БД
+            await register_user_if_not_exists(db, 100, "Клиент", org.id)
+            assert interaction_buffer.pending == 1
+            for telegram_id in (101, 102):
+                await register_user_if_not_exists(db, telegram_id, "Клиент", org.id)
+
+        buffer = InteractionBuffer()
+        moment = datetime(2030, 1, 1, 12, 0)
+        for telegram_id in (100, 101, 102):
+            buffer.touch(telegram_id, moment)
+        assert await buffer.flush(session_factory) == 3
+        assert buffer.pending == 0
+        assert await buffer.flush(session_factory) == 0
+        async with session_factory() as db:
+            stamps = (await db.scalars(select(User.last_interaction_at))).all()
+            assert stamps == [moment] * 3
+    finally:
+        interaction_buffer._pending.clear()
+        interaction_buffer._known_users.clear()
+
+
+def test_register_upsert_and_batched_flush(run_with_database):
+    run_with_database(_activity_flow)
@@ -0,0 +1,71 @@
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from webhook_server import WebhookSettings, create_webhook_app, load_webhook_settings
+
+SECRET = "s3cret"
+
+
+def _update(update_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Клиент"},
+            "text": "привет",
+        },
+    }
+
+
+async def _webhook_flow():
+    dp = Dispatcher()
+    release = asyncio.Event()
+    state = {"running": 0, "peak": 0, "done": 0}
+
+    @dp.message()
+    async def slow_handler(message: Message):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await release.wait()
+        state["running"] -= 1
+        state["done"] += 1
+
+    settings = WebhookSettings(base_url="https://bot.example.com", path="/tg", secret_token=SECRET,
+                               max_concurrent_updates=2, set_webhook_on_startup=False)
+    app = create_webhook_app(dp, Bot(token="42:TEST"), settings)
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    try:
+        response = await client.post("/tg", json=_update(1), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+        assert response.status == 401
+
+        headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+        # Ответ приходит до завершения обработки
+        for update_id in (1, 2):
+            response = await asyncio.wait_for(client.post("/tg", json=_update(update_id), headers=headers), 1)
+            assert response.status == 200
+        # Третий апдейт ждёт, пока освободится место
+        third = asyncio.create_task(client.post("/tg", json=_update(3), headers=headers))
+        await asyncio.sleep(0.1)
+        assert not third.done() and state["running"] == 2
+        release.set()
+        assert (await asyncio.wait_for(third, 1)).status == 200
+        assert (await client.get("/health")).status == 200
+    finally:
+        await client.close()
+    # Остановка дожидается апдейтов в обработке
+    assert state == {"running": 0, "peak": 2, "done": 3}
+
+
+def test_webhook_bounded_background_processing():
+    asyncio.run(_webhook_flow())
+
+
+def test_load_webhook_settings():
+    settings = load_webhook_settings({"WEBHOOK_BASE_URL": "https://bot.example.com/", "WEBHOOK_PATH": "hook",
+                                      "WEBAPP_PORT": "9000", "WEBHOOK_MAX_CONCURRENT_UPDATES": "8"})
+    assert settings.url == "https://bot.example.com/hook"
+    assert settings.port == 9000 and settings.max_concurrent_updates == 8 and settings.secret_token is None
@@ -0,0 +1,95 @@
+"""
+Кэш доступности слотов по ключу (организация, дата).
+Записи живут не дольше TTL, при переполнении вытесняются самые давно использованные (LRU).
+Кэш явно сбрасывается при создании/отмене брони и при изменении расписания
+"""
+import os
+import time as _time
+from collections import OrderedDict
+from datetime import date, time
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class DayAvailability(NamedTuple):
+    """Расписание дня и безопасные для записи слоты"""
+    start_time: Optional[time]
+    end_time: Optional[time]
+    max_sessions: Optional[int]
+    session_duration: Optional[int]
+    available_slots: List[time]
+
+
+class AvailabilityCache:
+    """TTL + LRU кэш доступности с счётчиками попаданий, промахов и вытеснений"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[int, date], Tuple[float, DayAvailability]]" = OrderedDict()
+        self._dates_by_organization: Dict[int, Set[date]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, organization_id: int, day: date) -> Optional[DayAvailability]:
+        key = (organization_id, day)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, organization_id: int, day: date, value: DayAvailability):
+        key = (organization_id, day)
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        self._dates_by_organization.setdefault(organization_id, set()).add(day)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, organization_id: int, day: Optional[date] = None):
+        """Сбрасывает дату организации или, если day не задан, все её даты"""
+        if day is not None:
+            self._remove((organization_id, day))
+            return
+        for cached_day in list(self._dates_by_organization.get(organization_id, ())):
+            self._remove((organization_id, cached_day))
+
+    def clear(self):
+        self._entries.clear()
+        self._dates_by_organization.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    def _remove(self, key: Tuple[int, date]):
+        if self._entries.pop(key, None) is None:
+            return
+        organization_id, day = key
+        dates = self._dates_by_organization.get(organization_id)
+        if dates is not None:
+            dates.discard(day)
+            if not dates:
+                del self._dates_by_organization[organization_id]
+
+
+availability_cache = AvailabilityCache(
+    max_entries=int(os.getenv('AVAILABILITY_CACHE_SIZE', '1024')),
+    ttl_seconds=float(os.getenv('AVAILABILITY_CACHE_TTL', '300'))
+)
@@ -1,118 +1,17 @@
 from datetime import datetime, time, timedelta
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Tuple
+from database.database import after_commit, commit_or_flush
 from database.models import Booking, Schedule, SpecificDate, Organization
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-
-
-def generate_time_slots(start_time: time, end_time: time, duration_minutes: int = 60) -> List[time]:
-    """
-    Генерирует список временных слотов между start_time и end_time с заданной длительностью
-    """
-    slots = []
-    current_time = datetime.combine(datetime.today(), start_time)
-    end_datetime = datetime.combine(datetime.today(), end_time)
-    
-    while current_time + timedelta(minutes=duration_minutes) <= end_datetime:
-        slots.append(current_time.time())
-        current_time += timedelta(minutes=duration_minutes)
-    
-    return slots
-
-
-def has_window_in_combination(combination: List[time]) -> bool:
-    """
-    Проверяет, есть ли "окно" в комбинации слотов
-    Окно - это пропущенный слот между первым и последним в комбинации
-    """
-    if len(combination) <= 1:
-        return False
-    
-    # Преобразуем в список с интервалами 60 минут
-    times_in_order = sorted(combination)
-    
-    # Проверяем, есть ли пропущенные 60-минутные интервалы между слотами
-    for i in range(len(times_in_order) - 1):
-        current_time = datetime.combine(datetime.today(), times_in_order[i])
-        next_time = datetime.combine(datetime.today(), times_in_order[i + 1])
-        
-        # Если разница больше чем длительность одного слота, значит есть "окно"
-        if next_time - current_time > timedelta(minutes=60):
-            return True
-    
-    return False
-
-
-def get_valid_combinations(available_slots: List[time], max_sessions: int, 
-                          booked_slots: List[time] = None) -> List[List[time]]:
-    """
-    Возвращает все допустимые комбинации слотов без "окон"
-    """
-    if booked_slots is None:
-        booked_slots = []
-    
-    import itertools
-    
-    valid_combinations = []
-    
-    # Сначала добавим уже забронированные слоты ко всем комбинациям
-    available_for_selection = [slot for slot in available_slots if slot not in booked_slots]
-    
-    # Генерация всех возможных комбинаций
-    remaining_slots_needed = max_sessions - len(booked_slots)
-    
-    if remaining_slots_needed <= 0:
-        return [booked_slots] if booked_slots else [[]]
-    
-    for r in range(1, remaining_slots_needed + 1):
-        for combo in itertools.combinations(available_for_selection, r):
-            full_combo = sorted(list(booked_slots + list(combo)))
-            if not has_window_in_combination(full_combo):
-                valid_combinations.append(full_combo)
-    
-    return valid_combinations
-
-
-def get_available_slots_no_windows(available_slots: List[time], max_sessions: int, 
-                                 booked_slots: List[time] = None) -> List[time]:
-    """
-    Возвращает список слотов, которые можно безопасно выбрать без риска создания "окна"
-    """
-    if booked_slots is None:
-        booked_slots = []
-    
-    if len(booked_slots) >= max_sessions:
-        return []
-    
-    available_for_selection = [slot for slot in available_slots if slot not in booked_slots]
-    
-    remaining_slots_needed = max_sessions - len(booked_slots)
-    
-    if remaining_slots_needed <= 0:
-        return []
-    
-    # Проверяем каждый доступный слот - может ли его выбор привести к комбинации без окон
-    safe_slots = []
-    
-    for slot in available_for_selection:
-        # Создаем временную комбинацию с этим слотом
-        temp_booked = booked_slots + [slot]
-        
-        # Находим все возможные комбинации с этим слотом
-        valid_combos = get_valid_combinations(available_slots, max_sessions, temp_booked)
-        
-        # Если существуют комбинации без окон, которые включают этот слот, добавляем его
-        if valid_combos:
-            # Проверяем, есть ли хотя бы одна комбинация, включающая этот слот
-            slot_used = False
-            for combo in valid_combos:
-                if slot in combo:
-                    slot_used = True
-                    break
-            if slot_used:
-                safe_slots.append(slot)
-    
-    return safe_slots
+from sqlalchemy import Date, Integer, func, literal, select, tuple_, union_all
+from utils.availability_cache import DayAvailability, availability_cache
+from utils.organization_cache import organization_directory
+from utils.schedule_store import schedule_store
+from utils.slot_engine import (  # noqa: F401 - алгоритм слотов импортируется отсюда и обработчиками
+    SlotRepository, build_day_availability, compute_availability, compute_day_availability,
+    generate_time_slots, get_available_slots_for_day, get_available_slots_no_windows,
+    get_available_slots_no_windows_reference, get_valid_combinations, has_window_in_combination
+)
 
 
 async def get_booked_slots_for_date(db: AsyncSession, organization_id: int, date: datetime.date) -> List[time]:
@@ -130,70 +29,246 @@ async def get_booked_slots_for_date(db: AsyncSession, organization_id: int, date
     return [bt for bt in booked_times]
 
 
+def _effective_schedule_query(organization_id: int, date: datetime.date):
+    """
+    Запрос действующего расписания одной строкой: специфическая дата (priority=0)
+    важнее расписания по дню недели (priority=1)
+    """
+    specific = select(
+        literal(0).label("priority"),
+        SpecificDate.start_time,
+        SpecificDate.end_time,
+        func.coalesce(SpecificDate.max_sessions_per_day, 1).label("max_sessions_per_day"),
+        # Предположим, что для специфических дат длительность по умолчанию 60 мин
+        literal(60).label("session_duration")
+    ).where(
+        SpecificDate.organization_id == organization_id,
+        SpecificDate.date == date
+    )
+    weekly = select(
+        literal(1).label("priority"),
+        Schedule.start_time,
+        Schedule.end_time,
+        Schedule.max_sessions_per_day,
+        Schedule.session_duration
+    ).where(
+        Schedule.organization_id == organization_id,
+        Schedule.day_of_week == date.weekday(),  # 0 - понедельник, 6 - воскресенье
+        Schedule.is_active == True
+    )
+    combined = union_all(specific, weekly).subquery()
+    return select(
+        combined.c.start_time,
+        combined.c.end_time,
+        combined.c.max_sessions_per_day,
+        combined.c.session_duration
+    ).order_by(combined.c.priority).limit(1)
+
+
 async def get_schedule_for_date(db: AsyncSession, organization_id: int, date: datetime.date) -> Tuple[time, time, int, int]:
     """
     Получает расписание для конкретной организации и даты, учитывая специфические даты
     Возвращает: (start_time, end_time, max_sessions_per_day, session_duration)
     """
-    # Сначала проверим, есть ли специфическое расписание для этой даты и организации
-    specific_date = await db.execute(
-        select(SpecificDate).where(
-            SpecificDate.organization_id == organization_id,
-            SpecificDate.date == date
-        )
+    result = await db.execute(_effective_schedule_query(organization_id, date))
+    row = result.first()
+    if row is None:
+        # Если нет расписания для этого дня и организации, возвращаем None
+        return None, None, None, None
+    return tuple(row)
+
+
+async def get_schedules_for_dates(db: AsyncSession, keys: Iterable[Tuple[int, datetime.date]]
+                                  ) -> Dict[Tuple[int, datetime.date], Tuple[time, time, int, int]]:
+    """
+    Пакетный вариант get_schedule_for_date для пар (organization_id, date) за один запрос
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    weekly_keys = list({(organization_id, day.weekday()) for organization_id, day in keys})
+    specific = select(
+        SpecificDate.organization_id,
+        SpecificDate.date.label("date"),
+        literal(None, Integer).label("day_of_week"),
+        SpecificDate.start_time,
+        SpecificDate.end_time,
+        func.coalesce(SpecificDate.max_sessions_per_day, 1).label("max_sessions_per_day"),
+        literal(60).label("session_duration")
+    ).where(tuple_(SpecificDate.organization_id, SpecificDate.date).in_(keys))
+    weekly = select(
+        Schedule.organization_id,
+        literal(None, Date).label("date"),
+        Schedule.day_of_week,
+        Schedule.start_time,
+        Schedule.end_time,
+        Schedule.max_sessions_per_day,
+        Schedule.session_duration
+    ).where(
+        tuple_(Schedule.organization_id, Schedule.day_of_week).in_(weekly_keys),
+        Schedule.is_active == True
     )
-    specific = specific_date.scalar_one_or_none()
-    
-    if specific:
-        return (
-            specific.start_time, 
-            specific.end_time, 
-            specific.max_sessions_per_day or 1,  # default to 1 if None
-            60  # Предположим, что для специфических дат длительность по умолчанию 60 мин
+    result = await db.execute(union_all(specific, weekly))
+
+    overrides = {}
+    weekly_rows = {}
+    for organization_id, day, day_of_week, *schedule in result:
+        if day is not None:
+            overrides.setdefault((organization_id, day), tuple(schedule))
+        else:
+            weekly_rows.setdefault((organization_id, day_of_week), tuple(schedule))
+    return {
+        (organization_id, day): overrides.get((organization_id, day))
+        or weekly_rows.get((organization_id, day.weekday()), (None, None, None, None))
+        for organization_id, day in keys
+    }
+
+
+async def get_effective_schedule(db: AsyncSession, organization_id: int, date: datetime.date) -> Tuple[time, time, int, int]:
+    """
+    То же, что get_schedule_for_date, но из снимка schedule_store (без запроса к БД)
+    """
+    snapshot = await schedule_store.snapshot(db, organization_id)
+    if snapshot.covers(date):
+        return snapshot.resolve(date)
+    return await get_schedule_for_date(db, organization_id, date)
+
+
+class SqlSlotRepository(SlotRepository):
+    """Расписания и брони для движка слотов из БД через сессию SQLAlchemy"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_schedule(self, organization_id: int, day: datetime.date) -> Tuple[time, time, int, int]:
+        return await get_effective_schedule(self.db, organization_id, day)
+
+    async def get_booked_slots(self, organization_id: int, day: datetime.date) -> List[time]:
+        return await get_booked_slots_for_date(self.db, organization_id, day)
+
+    async def get_booked_slots_range(self, organization_id: int, start_date: datetime.date,
+                                     end_date: datetime.date) -> Dict[datetime.date, List[time]]:
+        bookings = await self.db.execute(
+            select(Booking.booking_date, Booking.start_time).where(
+                Booking.organization_id == organization_id,
+                Booking.booking_date >= start_date,
+                Booking.booking_date <= end_date,
+                Booking.booking_status == "active"
+            )
         )
-    
-    # Если специфического расписания нет, используем по дням недели для организации
-    day_of_week = date.weekday()  # 0 - понедельник, 6 - воскресенье
-    
-    schedule = await db.execute(
+        booked_by_day = {}
+        for booking_date, start_time in bookings:
+            booked_by_day.setdefault(booking_date, []).append(start_time)
+        return booked_by_day
+
+
+async def get_day_availability(db: AsyncSession, organization_id: int, date: datetime.date) -> DayAvailability:
+    """
+    Возвращает расписание и безопасные слоты организации на дату.
+    Повторные запросы обслуживаются из availability_cache без обращения к БД
+    """
+    cached = availability_cache.get(organization_id, date)
+    if cached is not None:
+        return cached
+
+    availability = await compute_day_availability(SqlSlotRepository(db), organization_id, date)
+    availability_cache.set(organization_id, date, availability)
+    return availability
+
+
+async def get_availability_range(db: AsyncSession, organization_id: int, start_date: datetime.date,
+                                 end_date: datetime.date) -> Dict[datetime.date, DayAvailability]:
+    """
+    Возвращает доступность организации на каждый день диапазона [start_date, end_date].
+    Расписание берётся из schedule_store, брони недостающих в availability_cache дней
+    загружаются одним запросом, результаты по дням попадают в кэш
+    """
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    result = {day: availability_cache.get(organization_id, day) for day in days}
+    missing = [day for day, value in result.items() if value is None]
+    if not missing:
+        return result
+
+    computed = await compute_availability(SqlSlotRepository(db), organization_id, missing)
+    for day, availability in computed.items():
+        result[day] = availability
+        availability_cache.set(organization_id, day, availability)
+    return result
+
+
+def _invalidate_schedule(organization_id: int, date: datetime.date = None):
+    schedule_store.invalidate(organization_id)
+    availability_cache.invalidate(organization_id, date)
+
+
+async def set_schedule_for_day(db: AsyncSession, organization_id: int, day_of_week: int, start_time: time,
+                               end_time: time, max_sessions_per_day: int = 1, session_duration: int = 60) -> Schedule:
+    """
+    Устанавливает расписание организации для дня недели (0 - понедельник, 6 - воскресенье)
+    """
+    result = await db.execute(
         select(Schedule).where(
             Schedule.organization_id == organization_id,
-            Schedule.day_of_week == day_of_week,
-            Schedule.is_active == True
+            Schedule.day_of_week == day_of_week
         )
     )
-    schedule_item = schedule.scalar_one_or_none()
-    
-    if schedule_item:
-        return (
-            schedule_item.start_time,
-            schedule_item.end_time,
-            schedule_item.max_sessions_per_day,
-            schedule_item.session_duration
+    schedule_item = result.scalars().first()
+    if schedule_item is None:
+        schedule_item = Schedule(organization_id=organization_id, day_of_week=day_of_week)
+        db.add(schedule_item)
+    schedule_item.start_time = start_time
+    schedule_item.end_time = end_time
+    schedule_item.max_sessions_per_day = max_sessions_per_day
+    schedule_item.session_duration = session_duration
+    schedule_item.is_active = True
+    await commit_or_flush(db)
+    after_commit(db, lambda: _invalidate_schedule(organization_id))
+    return schedule_item
+
+
+async def set_specific_date(db: AsyncSession, organization_id: int, date: datetime.date, start_time: time,
+                            end_time: time, max_sessions_per_day: int = None) -> SpecificDate:
+    """
+    Устанавливает расписание организации для конкретной даты
+    """
+    result = await db.execute(
+        select(SpecificDate).where(
+            SpecificDate.organization_id == organization_id,
+            SpecificDate.date == date
         )
-    else:
-        # Если нет расписания для этого дня и организации, возвращаем None
-        return None, None, None, None
+    )
+    specific = result.scalars().first()
+    if specific is None:
+        specific = SpecificDate(organization_id=organization_id, date=date)
+        db.add(specific)
+    specific.start_time = start_time
+    specific.end_time = end_time
+    specific.max_sessions_per_day = max_sessions_per_day
+    await commit_or_flush(db)
+    after_commit(db, lambda: _invalidate_schedule(organization_id, date))
+    return specific
 
 
 async def get_organization_by_unique_code(db: AsyncSession, unique_code: str) -> Organization:
     """
     Получает организацию по уникальному коду
+    Код сначала ищется в organization_directory, неизвестные коды в БД повторно не проверяются
     """
-    result = await db.execute(
-        select(Organization).where(Organization.unique_code == unique_code)
-    )
-    return result.scalar_one_or_none()
+    organization_id = await organization_directory.resolve(db, unique_code)
+    if organization_id is None:
+        return None
+    return await db.get(Organization, organization_id)
 
 
 async def get_organization_by_admin_id(db: AsyncSession, admin_telegram_id: int) -> Organization:
     """
     Получает организацию по ID администратора
+    Принадлежность администратора берётся из organization_directory
     """
-    result = await db.execute(
-        select(Organization).where(Organization.admin_telegram_id == admin_telegram_id)
-    )
-    return result.scalar_one_or_none()
+    organization_id = await organization_directory.resolve_admin(db, admin_telegram_id)
+    if organization_id is None:
+        return None
+    return await db.get(Organization, organization_id)
 
 
 async def create_organization(db: AsyncSession, name: str, address: str, contact_info: str, description: str, admin_telegram_id: int) -> Organization:
@@ -208,6 +283,8 @@ async def create_organization(db: AsyncSession, name: str, address: str, contact
         admin_telegram_id=admin_telegram_id
     )
     db.add(org)
-    await db.commit()
+    await commit_or_flush(db)
     await db.refresh(org)
+    unique_code, organization_id = org.unique_code, org.id
+    after_commit(db, lambda: organization_directory.register(unique_code, organization_id, admin_telegram_id))
     return org
\ No newline at end of file
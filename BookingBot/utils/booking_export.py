@@ -0,0 +1,78 @@
+"""
+Выгрузка броней организации в CSV или JSONL.
+Строки пишутся в файл по мере чтения из stream_organization_bookings,
+поэтому память не растёт с размером истории; запись на диск идёт в отдельном потоке,
+чтобы не блокировать цикл событий бота
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.booking_service import EXPORT_COLUMNS, stream_organization_bookings
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+# Ограничение Bot API на отправку файла ботом
+TELEGRAM_MAX_UPLOAD_BYTES = 50 * 1000 * 1000
+# С этих символов Excel и LibreOffice начинают формулу
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class ExportTooLargeError(ValueError):
+    """Файл выгрузки превысил допустимый размер"""
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    value = _plain(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _format_chunk(chunk, export_format: str) -> str:
+    if export_format == "jsonl":
+        return "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, map(_plain, row))), ensure_ascii=False) + "\n" for row in chunk
+        )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_cell(value) for value in row] for row in chunk)
+    return buffer.getvalue()
+
+
+def _write(output, text: str) -> int:
+    output.write(text)
+    return output.tell()
+
+
+async def export_organization_bookings(db: AsyncSession, organization_id: int, path: str,
+                                       export_format: str = "csv", chunk_size: int = 1000,
+                                       max_bytes: Optional[int] = None) -> int:
+    """
+    Записывает брони организации в файл path.
+    При max_bytes прерывает выгрузку с ExportTooLargeError, как только файл его превысит
+    Возвращает: число выгруженных броней
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+    count = 0
+    output = await asyncio.to_thread(open, path, "wb")
+    try:
+        if export_format == "csv":
+            await asyncio.to_thread(_write, output, _format_chunk([EXPORT_FIELDS], "csv").encode("utf-8"))
+        async for chunk in stream_organization_bookings(db, organization_id, chunk_size):
+            size = await asyncio.to_thread(_write, output, _format_chunk(chunk, export_format).encode("utf-8"))
+            count += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise ExportTooLargeError(f"Выгрузка больше {max_bytes} байт")
+    finally:
+        await asyncio.to_thread(output.close)
+    return count
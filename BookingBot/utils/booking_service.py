@@ -1,33 +1,88 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import after_commit, commit_or_flush
 from database.models import Booking, User, Organization
-from datetime import datetime, date, time
-from typing import List, Optional
-from sqlalchemy import select
+from database.read_models import (
+    BOOKING_VIEW_COLUMNS, ORGANIZATION_VIEW_COLUMNS, USER_VIEW_COLUMNS, BookingView, OrganizationView, UserView,
+    to_views
+)
+from datetime import datetime, date, time, timedelta
+from enum import Enum
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from utils.availability_cache import availability_cache
+from utils.booking_algorithm import get_available_slots_for_day, get_booked_slots_for_date, get_schedule_for_date
+from utils.user_activity import interaction_buffer
+
+
+class BookingOutcome(Enum):
+    CREATED = "created"
+    SLOT_TAKEN = "slot_taken"  # слот успели занять параллельно
+    SLOT_UNAVAILABLE = "slot_unavailable"  # слот вне расписания или создаёт "окно"
+
+
+# Колонки uq_bookings_active_slot в тексте ошибки SQLite (PostgreSQL называет сам индекс)
+_SLOT_INDEX_COLUMNS = "bookings.organization_id, bookings.booking_date, bookings.start_time"
+
+
+class BookingResult(NamedTuple):
+    outcome: BookingOutcome
+    booking: Optional[Booking] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome is BookingOutcome.CREATED
 
 
 async def register_user_if_not_exists(db: AsyncSession, telegram_id: int, full_name: str, organization_id: int, username: str = None, role: str = "client"):
-    """Регистрирует пользователя в системе, если он еще не зарегистрирован"""
-    existing_user = await db.execute(
-        select(User).where(User.telegram_id == telegram_id)
-    )
-    user = existing_user.scalar_one_or_none()
-    
-    if not user:
-        user = User(
+    """
+    Регистрирует пользователя в системе, если он еще не зарегистрирован.
+    Новый пользователь записывается одним INSERT ... ON CONFLICT DO UPDATE,
+    для уже известных время взаимодействия копится в interaction_buffer
+    """
+    now = datetime.utcnow()
+    if interaction_buffer.is_known(telegram_id):
+        interaction_buffer.touch(telegram_id, now)
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        statement = insert(User).values(
             telegram_id=telegram_id,
             full_name=full_name,
             username=username,
             organization_id=organization_id,
             role=role,
-            created_at=datetime.utcnow()
+            created_at=now,
+            last_interaction_at=now
         )
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-    
-    # Обновляем время последнего взаимодействия
-    user.last_interaction_at = datetime.utcnow()
-    await db.commit()
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={"last_interaction_at": statement.excluded.last_interaction_at}
+        )
+        await db.execute(statement)
+    else:
+        existing_user = await db.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )
+        user = existing_user.scalar_one_or_none()
+        if not user:
+            db.add(User(
+                telegram_id=telegram_id,
+                full_name=full_name,
+                username=username,
+                organization_id=organization_id,
+                role=role,
+                created_at=now,
+                last_interaction_at=now
+            ))
+        else:
+            user.last_interaction_at = now
+    await commit_or_flush(db)
+    after_commit(db, lambda: interaction_buffer.mark_known(telegram_id))
 
 
 async def create_booking(db: AsyncSession, organization_id: int, telegram_user_id: int, user_full_name: str, 
@@ -46,15 +101,92 @@ async def create_booking(db: AsyncSession, organization_id: int, telegram_user_i
     )
     
     db.add(booking)
-    await db.commit()
+    await commit_or_flush(db)
     await db.refresh(booking)
+    after_commit(db, lambda: availability_cache.invalidate(organization_id, booking_date))
     
     return booking
 
 
-async def get_user_bookings(db: AsyncSession, telegram_user_id: int, organization_id: int = None) -> List[Booking]:
+async def book_slot(db: AsyncSession, organization_id: int, telegram_user_id: int, user_full_name: str,
+                    booking_date: date, start_time: time, service_type: str = None,
+                    now: Optional[datetime] = None) -> BookingResult:
+    """
+    Бронирует слот с повторной проверкой доступности внутри транзакции.
+    Прошедшие дата и время (устаревшая или повторно отправленная кнопка) - SLOT_UNAVAILABLE.
+    Одновременные брони одного слота отсекает уникальный индекс uq_bookings_active_slot:
+    проигравший запрос получает BookingOutcome.SLOT_TAKEN вместо исключения.
+    Брони разных слотов одного дня сериализуются блокировкой дня (_lock_booking_day),
+    иначе обе могли бы пройти повторную проверку и превысить max_sessions или создать "окно"
+    """
+    if now is None:
+        now = datetime.now()
+    if datetime.combine(booking_date, start_time) <= now:
+        return BookingResult(BookingOutcome.SLOT_UNAVAILABLE)
+    await _lock_booking_day(db, organization_id, booking_date)
+    start, end, max_sessions, session_duration = await get_schedule_for_date(db, organization_id, booking_date)
+    if start is None:
+        return BookingResult(BookingOutcome.SLOT_UNAVAILABLE)
+    booked_slots = await get_booked_slots_for_date(db, organization_id, booking_date)
+    if start_time in booked_slots:
+        return BookingResult(BookingOutcome.SLOT_TAKEN)
+    if start_time not in get_available_slots_for_day(start, end, max_sessions, session_duration, booked_slots):
+        return BookingResult(BookingOutcome.SLOT_UNAVAILABLE)
+
+    end_time = (datetime.combine(booking_date, start_time) + timedelta(minutes=session_duration)).time()
+    booking = Booking(
+        organization_id=organization_id,
+        telegram_user_id=telegram_user_id,
+        user_full_name=user_full_name,
+        booking_date=booking_date,
+        start_time=start_time,
+        end_time=end_time,
+        service_type=service_type,
+        booking_status="active",
+        created_at=datetime.utcnow()
+    )
+    try:
+        async with db.begin_nested():
+            db.add(booking)
+    except IntegrityError as e:
+        if not _is_slot_conflict(e):
+            raise
+        availability_cache.invalidate(organization_id, booking_date)
+        return BookingResult(BookingOutcome.SLOT_TAKEN)
+    except OperationalError as e:
+        # SQLite: транзакция уже читала до book_slot (BEGIN IMMEDIATE не применить),
+        # и её снимок устарел - базу успела изменить параллельная бронь
+        if "database is locked" not in str(e.orig):
+            raise
+        availability_cache.invalidate(organization_id, booking_date)
+        return BookingResult(BookingOutcome.SLOT_TAKEN)
+    await commit_or_flush(db)
+    after_commit(db, lambda: availability_cache.invalidate(organization_id, booking_date))
+    return BookingResult(BookingOutcome.CREATED, booking)
+
+
+async def _lock_booking_day(db: AsyncSession, organization_id: int, booking_date: date):
+    """
+    Транзакционная advisory-блокировка дня организации в PostgreSQL (снимается при commit/rollback).
+    В SQLite блокируется вся база: новая транзакция начинается как BEGIN IMMEDIATE,
+    и параллельные брони ждут друг друга по busy_timeout, а не получают "database is locked"
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(organization_id, booking_date.toordinal())))
+    elif dialect == "sqlite" and not db.in_transaction():
+        await db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+
+def _is_slot_conflict(error: IntegrityError) -> bool:
+    """Нарушен именно uq_bookings_active_slot, а не другое ограничение"""
+    message = str(error.orig)
+    return "uq_bookings_active_slot" in message or _SLOT_INDEX_COLUMNS in message
+
+
+async def get_user_bookings(db: AsyncSession, telegram_user_id: int, organization_id: int = None) -> List[BookingView]:
     """Получает все бронирования пользователя"""
-    query = select(Booking).where(
+    query = select(*BOOKING_VIEW_COLUMNS).where(
         Booking.telegram_user_id == telegram_user_id,
         Booking.booking_status == "active"
     ).order_by(Booking.booking_date, Booking.start_time)
@@ -63,18 +195,117 @@ async def get_user_bookings(db: AsyncSession, telegram_user_id: int, organizatio
         query = query.where(Booking.organization_id == organization_id)
     
     result = await db.execute(query)
-    return result.scalars().all()
+    return to_views(result, BookingView)
+
+
+# Курсор страницы: (booking_date, start_time, id) крайней брони
+BookingCursor = Tuple[date, time, int]
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+class BookingPage(NamedTuple):
+    bookings: List[BookingView]
+    next_cursor: Optional[BookingCursor] = None  # None - следующей страницы нет
+    prev_cursor: Optional[BookingCursor] = None  # None - предыдущей страницы нет
+
 
+def booking_cursor(booking) -> BookingCursor:
+    return booking.booking_date, booking.start_time, booking.id
 
-async def get_organization_bookings(db: AsyncSession, organization_id: int) -> List[Booking]:
+
+async def _keyset_page(db: AsyncSession, query, after: Optional[BookingCursor], before: Optional[BookingCursor],
+                       limit: int) -> BookingPage:
+    """
+    Страница по ключу (booking_date, start_time, id): условие на ключ вместо OFFSET,
+    поэтому стоимость страницы не зависит от её номера.
+    after - страница после курсора, before - страница перед ним, без курсоров - первая страница
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = tuple_(Booking.booking_date, Booking.start_time, Booking.id)
+    if before is not None:
+        query = query.where(key < tuple_(*before)).order_by(
+            Booking.booking_date.desc(), Booking.start_time.desc(), Booking.id.desc()
+        )
+    else:
+        if after is not None:
+            query = query.where(key > tuple_(*after))
+        query = query.order_by(Booking.booking_date, Booking.start_time, Booking.id)
+    result = await db.execute(query.limit(limit + 1))
+    bookings = to_views(result, BookingView)
+    has_more = len(bookings) > limit
+    bookings = bookings[:limit]
+    if before is not None:
+        bookings.reverse()
+    if not bookings:
+        return BookingPage([])
+    if before is not None:
+        return BookingPage(bookings, booking_cursor(bookings[-1]), booking_cursor(bookings[0]) if has_more else None)
+    return BookingPage(
+        bookings,
+        booking_cursor(bookings[-1]) if has_more else None,
+        booking_cursor(bookings[0]) if after is not None else None
+    )
+
+
+async def get_user_bookings_page(db: AsyncSession, telegram_user_id: int, after: Optional[BookingCursor] = None,
+                                 before: Optional[BookingCursor] = None, limit: int = PAGE_SIZE,
+                                 organization_id: int = None) -> BookingPage:
+    """Страница активных бронирований пользователя"""
+    query = select(*BOOKING_VIEW_COLUMNS).where(
+        Booking.telegram_user_id == telegram_user_id,
+        Booking.booking_status == "active"
+    )
+    if organization_id:
+        query = query.where(Booking.organization_id == organization_id)
+    return await _keyset_page(db, query, after, before, limit)
+
+
+async def get_organization_bookings_page(db: AsyncSession, organization_id: int,
+                                         after: Optional[BookingCursor] = None,
+                                         before: Optional[BookingCursor] = None,
+                                         limit: int = PAGE_SIZE) -> BookingPage:
+    """Страница активных бронирований организации"""
+    query = select(*BOOKING_VIEW_COLUMNS).where(
+        Booking.organization_id == organization_id,
+        Booking.booking_status == "active"
+    )
+    return await _keyset_page(db, query, after, before, limit)
+
+
+async def get_organization_bookings(db: AsyncSession, organization_id: int) -> List[BookingView]:
     """Получает все бронирования для организации"""
     result = await db.execute(
-        select(Booking).where(
+        select(*BOOKING_VIEW_COLUMNS).where(
             Booking.organization_id == organization_id,
             Booking.booking_status == "active"
         ).order_by(Booking.booking_date, Booking.start_time)
     )
-    return result.scalars().all()
+    return to_views(result, BookingView)
+
+
+# Колонки выгрузки броней организации
+EXPORT_COLUMNS = (
+    Booking.id, Booking.booking_date, Booking.start_time, Booking.end_time, Booking.booking_status,
+    Booking.telegram_user_id, Booking.user_full_name, Booking.service_type, Booking.created_at,
+    Booking.cancelled_at,
+)
+
+
+async def stream_organization_bookings(db: AsyncSession, organization_id: int, chunk_size: int = 1000,
+                                       active_only: bool = False) -> AsyncIterator[list]:
+    """
+    Отдаёт брони организации порциями по chunk_size строк (серверный курсор),
+    не загружая всю историю в память. Строки - кортежи колонок EXPORT_COLUMNS
+    """
+    query = select(*EXPORT_COLUMNS).where(Booking.organization_id == organization_id)
+    if active_only:
+        query = query.where(Booking.booking_status == "active")
+    query = query.order_by(Booking.booking_date, Booking.start_time, Booking.id)
+    result = await db.stream(query.execution_options(yield_per=chunk_size))
+    async for chunk in result.partitions():
+        yield chunk
 
 
 async def cancel_booking(db: AsyncSession, booking_id: int, telegram_user_id: int) -> bool:
@@ -90,7 +321,9 @@ async def cancel_booking(db: AsyncSession, booking_id: int, telegram_user_id: in
     if booking and booking.booking_status == "active":
         booking.booking_status = "cancelled"
         booking.cancelled_at = datetime.utcnow()
-        await db.commit()
+        await commit_or_flush(db)
+        organization_id, booking_date = booking.organization_id, booking.booking_date
+        after_commit(db, lambda: availability_cache.invalidate(organization_id, booking_date))
         return True
     
     return False
@@ -108,7 +341,7 @@ async def create_user(db: AsyncSession, telegram_id: int, full_name: str, userna
     )
     
     db.add(user)
-    await db.commit()
+    await commit_or_flush(db)
     await db.refresh(user)
     
     return user
@@ -122,17 +355,18 @@ async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int) -> User:
     return result.scalar_one_or_none()
 
 
-async def get_organization_users(db: AsyncSession, organization_id: int) -> List[User]:
+async def get_organization_users(db: AsyncSession, organization_id: int) -> List[UserView]:
     """Получает всех пользователей организации"""
     result = await db.execute(
-        select(User).where(User.organization_id == organization_id)
+        select(*USER_VIEW_COLUMNS).where(User.organization_id == organization_id)
     )
-    return result.scalars().all()
+    return to_views(result, UserView)
 
 
-async def get_organization_by_id(db: AsyncSession, organization_id: int) -> Organization:
+async def get_organization_by_id(db: AsyncSession, organization_id: int) -> Optional[OrganizationView]:
     """Получает организацию по ID"""
     result = await db.execute(
-        select(Organization).where(Organization.id == organization_id)
+        select(*ORGANIZATION_VIEW_COLUMNS).where(Organization.id == organization_id)
     )
-    return result.scalar_one_or_none()
\ No newline at end of file
+    row = result.one_or_none()
+    return OrganizationView._make(row) if row is not None else None
\ No newline at end of file
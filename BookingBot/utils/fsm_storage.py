@@ -0,0 +1,160 @@
+"""
+Хранилище состояний FSM aiogram в базе данных вместо MemoryStorage.
+Состояния переживают перезапуск и общие для нескольких процессов бота.
+Запись идёт сразу в БД. Локальный кэш чтения (cache_ttl_seconds) по умолчанию выключен:
+записи других процессов он не видит, поэтому включать его можно только для одного процесса бота.
+Диалоги без изменений дольше ttl_seconds считаются брошенными:
+они читаются как пустые и периодически удаляются
+"""
+import json
+import os
+import time as _time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.models import FsmRecord
+
+
+def build_storage_key(key: StorageKey) -> str:
+    parts = [str(key.bot_id), str(key.chat_id), str(key.user_id)]
+    if key.thread_id:
+        parts.append(str(key.thread_id))
+    # business_connection_id появился в aiogram 3.5; requirements.txt закрепляет более ранние версии
+    business_connection_id = getattr(key, "business_connection_id", None)
+    if business_connection_id:
+        parts.append(str(business_connection_id))
+    parts.append(key.destiny)
+    return ":".join(parts)
+
+
+class SQLAlchemyStorage(BaseStorage):
+    """FSM-хранилище поверх AsyncSession с локальным кэшем чтения и истечением диалогов"""
+
+    def __init__(self, session_factory, ttl_seconds: float = 86400.0, cache_ttl_seconds: float = 0.0,
+                 cache_size: int = 10000, purge_interval: float = 600.0,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_size = cache_size
+        self.purge_interval = purge_interval
+        self._clock = clock
+        # storage_key -> (момент чтения, state, data)
+        self._cache: "OrderedDict[str, Tuple[float, Optional[str], Dict[str, Any]]]" = OrderedDict()
+        self._last_purge = clock()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await self._write(key, state=state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._read(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._write(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._read(key)
+        return data.copy()
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+    async def purge_expired(self) -> int:
+        """Удаляет брошенные диалоги; возвращает число удалённых записей"""
+        self._last_purge = self._clock()
+        async with self.session_factory() as db:
+            result = await db.execute(delete(FsmRecord).where(FsmRecord.updated_at < self._expired_before()))
+            await db.commit()
+        return result.rowcount
+
+    def _expired_before(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+
+    async def _read(self, key: StorageKey) -> Tuple[Optional[str], Dict[str, Any]]:
+        storage_key = build_storage_key(key)
+        now = self._clock()
+        cached = self._cache.get(storage_key)
+        if cached is not None and now - cached[0] < self.cache_ttl_seconds:
+            self._cache.move_to_end(storage_key)
+            return cached[1], cached[2]
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(FsmRecord.state, FsmRecord.data, FsmRecord.updated_at).where(
+                    FsmRecord.storage_key == storage_key
+                )
+            )
+            row = result.one_or_none()
+            if row is not None and row.updated_at < self._expired_before():
+                # Брошенный диалог: удаляем, чтобы частичная запись не подняла старые данные
+                await db.execute(delete(FsmRecord).where(FsmRecord.storage_key == storage_key))
+                await db.commit()
+                row = None
+        if row is None:
+            state, data = None, {}
+        else:
+            state, data = row.state, json.loads(row.data) if row.data else {}
+        self._remember(storage_key, state, data)
+        return state, data
+
+    async def _write(self, key: StorageKey, **values):
+        """Записывает только переданную колонку (state или data), не затирая вторую"""
+        storage_key = build_storage_key(key)
+        columns = {name: json.dumps(value, ensure_ascii=False) if name == "data" else value
+                   for name, value in values.items()}
+        async with self.session_factory() as db:
+            await self._upsert(db, storage_key, columns)
+            await db.commit()
+        cached = self._cache.get(storage_key)
+        if cached is not None:
+            _, state, data = cached
+            self._remember(storage_key, values.get("state", state), values.get("data", data))
+        if self._clock() - self._last_purge >= self.purge_interval:
+            await self.purge_expired()
+
+    async def _upsert(self, db, storage_key: str, columns: Dict[str, Optional[str]]):
+        columns = dict(columns, updated_at=datetime.utcnow())
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            statement = insert(FsmRecord).values(storage_key=storage_key, **columns)
+            statement = statement.on_conflict_do_update(
+                index_elements=[FsmRecord.storage_key],
+                set_={name: getattr(statement.excluded, name) for name in columns}
+            )
+            await db.execute(statement)
+        else:
+            record = await db.get(FsmRecord, storage_key)
+            if record is None:
+                record = FsmRecord(storage_key=storage_key)
+                db.add(record)
+            for name, value in columns.items():
+                setattr(record, name, value)
+
+    def _remember(self, storage_key: str, state: Optional[str], data: Dict[str, Any]):
+        if self.cache_ttl_seconds <= 0:
+            return
+        self._cache[storage_key] = (self._clock(), state, data)
+        self._cache.move_to_end(storage_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def create_fsm_storage(session_factory) -> SQLAlchemyStorage:
+    """
+    Хранилище с настройками из FSM_STATE_TTL, FSM_CACHE_TTL и FSM_CACHE_SIZE.
+    FSM_CACHE_TTL > 0 - только при одном процессе бота (polling без реплик)
+    """
+    return SQLAlchemyStorage(
+        session_factory,
+        ttl_seconds=float(os.getenv('FSM_STATE_TTL', '86400')),
+        cache_ttl_seconds=float(os.getenv('FSM_CACHE_TTL', '0')),
+        cache_size=int(os.getenv('FSM_CACHE_SIZE', '10000')),
+    )
@@ -0,0 +1,159 @@
+"""
+Поиск организации по уникальному коду и по администратору без запроса к БД на каждое сообщение.
+Карта код -> id организации загружается при старте и пополняется при create_organization;
+коды, которых нет в карте, один раз проверяются в БД (их могли создать другие процессы),
+а неизвестные запоминаются в ограниченном отрицательном кэше.
+Так же кэшируется администратор -> id организации (или её отсутствие - для клиентов).
+Ограничитель попыток не даёт перебирать коды через /code
+"""
+import os
+import time as _time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Organization
+
+# Длиннее кода быть не может - такие строки отбрасываются без запроса к БД
+MAX_CODE_LENGTH = 64
+
+
+class OrganizationDirectory:
+    """
+    Карта код -> id организации с отрицательным кэшем неизвестных кодов
+    и LRU-кэш администратор -> id организации
+    """
+
+    def __init__(self, negative_cache_size: int = 10000, negative_ttl_seconds: float = 300.0,
+                 admin_cache_size: int = 100000, clock: Callable[[], float] = _time.monotonic):
+        self.negative_cache_size = negative_cache_size
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.admin_cache_size = admin_cache_size
+        self._clock = clock
+        self._ids_by_code: Dict[str, int] = {}
+        self._unknown_codes: "OrderedDict[str, float]" = OrderedDict()
+        # admin_telegram_id -> (истекает, id организации); для "не администратор" id - None.
+        # Обе записи живут negative_ttl_seconds: организацию мог создать, удалить
+        # или передать другому администратору другой процесс
+        self._ids_by_admin: "OrderedDict[int, Tuple[float, Optional[int]]]" = OrderedDict()
+        self.loaded = False
+
+    async def load(self, db: AsyncSession):
+        """Загружает коды и администраторов всех организаций одним запросом"""
+        result = await db.execute(
+            select(Organization.unique_code, Organization.admin_telegram_id, Organization.id).order_by(Organization.id)
+        )
+        rows = result.all()
+        self._ids_by_code = {code: organization_id for code, _, organization_id in rows if code}
+        self._unknown_codes.clear()
+        self._ids_by_admin.clear()
+        for _, admin_telegram_id, organization_id in rows:
+            # При нескольких организациях у администратора берётся первая по id, как в resolve_admin
+            if admin_telegram_id not in self._ids_by_admin:
+                self._remember_admin(admin_telegram_id, organization_id)
+        self.loaded = True
+
+    def register(self, code: str, organization_id: int, admin_telegram_id: Optional[int] = None):
+        """Добавляет новую организацию (вызывается после фиксации create_organization)"""
+        if code:
+            self._ids_by_code[code] = organization_id
+            self._unknown_codes.pop(code, None)
+        if admin_telegram_id is not None:
+            cached = self._ids_by_admin.get(admin_telegram_id)
+            if cached is None or cached[1] is None:
+                self._remember_admin(admin_telegram_id, organization_id)
+
+    def invalidate_admin(self, admin_telegram_id: int):
+        """Сбрасывает запись администратора (при смене владельца или изменении организации)"""
+        self._ids_by_admin.pop(admin_telegram_id, None)
+
+    async def resolve_admin(self, db: AsyncSession, admin_telegram_id: int) -> Optional[int]:
+        """id организации администратора или None, если пользователь не администратор"""
+        cached = self._ids_by_admin.get(admin_telegram_id)
+        if cached is not None and cached[0] > self._clock():
+            self._ids_by_admin.move_to_end(admin_telegram_id)
+            return cached[1]
+        result = await db.execute(
+            select(Organization.id).where(Organization.admin_telegram_id == admin_telegram_id)
+            .order_by(Organization.id).limit(1)
+        )
+        organization_id = result.scalar_one_or_none()
+        self._remember_admin(admin_telegram_id, organization_id)
+        return organization_id
+
+    def _remember_admin(self, admin_telegram_id: int, organization_id: Optional[int]):
+        self._ids_by_admin[admin_telegram_id] = (self._clock() + self.negative_ttl_seconds, organization_id)
+        self._ids_by_admin.move_to_end(admin_telegram_id)
+        while len(self._ids_by_admin) > self.admin_cache_size:
+            self._ids_by_admin.popitem(last=False)
+
+    async def resolve(self, db: AsyncSession, code: str) -> Optional[int]:
+        """id организации по коду или None"""
+        code = (code or "").strip()
+        if not code or len(code) > MAX_CODE_LENGTH:
+            return None
+        if not self.loaded:
+            await self.load(db)
+        organization_id = self._ids_by_code.get(code)
+        if organization_id is not None:
+            return organization_id
+        expires_at = self._unknown_codes.get(code)
+        if expires_at is not None:
+            if expires_at > self._clock():
+                return None
+            del self._unknown_codes[code]
+
+        organization_id = await db.scalar(select(Organization.id).where(Organization.unique_code == code))
+        if organization_id is not None:
+            self._ids_by_code[code] = organization_id
+        else:
+            self._unknown_codes[code] = self._clock() + self.negative_ttl_seconds
+            while len(self._unknown_codes) > self.negative_cache_size:
+                self._unknown_codes.popitem(last=False)
+        return organization_id
+
+    def clear(self):
+        self._ids_by_code.clear()
+        self._unknown_codes.clear()
+        self._ids_by_admin.clear()
+        self.loaded = False
+
+
+class AttemptLimiter:
+    """Не больше max_attempts попыток за period_seconds на пользователя (скользящее окно)"""
+
+    def __init__(self, max_attempts: int = 5, period_seconds: float = 60.0, max_users: int = 100000,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.max_attempts = max_attempts
+        self.period_seconds = period_seconds
+        self.max_users = max_users
+        self._clock = clock
+        self._attempts: "OrderedDict[int, Deque[float]]" = OrderedDict()
+
+    def allow(self, user_id: int) -> bool:
+        """Учитывает попытку; False, если лимит исчерпан"""
+        now = self._clock()
+        attempts = self._attempts.get(user_id)
+        if attempts is None:
+            attempts = self._attempts[user_id] = deque()
+        self._attempts.move_to_end(user_id)
+        while attempts and attempts[0] <= now - self.period_seconds:
+            attempts.popleft()
+        if len(attempts) >= self.max_attempts:
+            return False
+        attempts.append(now)
+        while len(self._attempts) > self.max_users:
+            self._attempts.popitem(last=False)
+        return True
+
+
+organization_directory = OrganizationDirectory(
+    negative_cache_size=int(os.getenv('ORG_CODE_NEGATIVE_CACHE_SIZE', '10000')),
+    negative_ttl_seconds=float(os.getenv('ORG_CODE_NEGATIVE_CACHE_TTL', '300')),
+    admin_cache_size=int(os.getenv('ORG_ADMIN_CACHE_SIZE', '100000'))
+)
+
+code_attempt_limiter = AttemptLimiter(
+    max_attempts=int(os.getenv('ORG_CODE_ATTEMPTS_PER_MINUTE', '5')),
+    period_seconds=60
+)
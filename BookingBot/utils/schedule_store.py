@@ -0,0 +1,148 @@
+"""
+Хранилище расписаний организаций в памяти процесса.
+При первом обращении загружает все активные Schedule и будущие SpecificDate организации,
+дальше расписание на дату - поиск в словаре. Снимок сбрасывается при изменении расписания
+через set_schedule_for_day/set_specific_date, а изменения из других процессов
+обнаруживаются периодической проверкой версии (Schedule.updated_at и число строк;
+правка уже существующей SpecificDate другим процессом видна только после сброса снимка)
+"""
+import os
+import time as _time
+from collections import OrderedDict
+from datetime import date, time, timedelta
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Schedule, SpecificDate
+
+NO_SCHEDULE = (None, None, None, None)
+
+
+def resolve_schedule(specific: Optional[SpecificDate], schedule_item: Optional[Schedule]) -> Tuple[time, time, int, int]:
+    """
+    Выбирает действующее расписание: специфическая дата важнее расписания по дню недели
+    Возвращает: (start_time, end_time, max_sessions_per_day, session_duration)
+    """
+    if specific:
+        return (
+            specific.start_time,
+            specific.end_time,
+            specific.max_sessions_per_day or 1,  # default to 1 if None
+            60  # Предположим, что для специфических дат длительность по умолчанию 60 мин
+        )
+    if schedule_item:
+        return (
+            schedule_item.start_time,
+            schedule_item.end_time,
+            schedule_item.max_sessions_per_day,
+            schedule_item.session_duration
+        )
+    return NO_SCHEDULE
+
+
+class ScheduleSnapshot:
+    """Расписание организации: по дням недели и исключения начиная с valid_from"""
+    __slots__ = ("weekly", "overrides", "valid_from", "version", "checked_at")
+
+    def __init__(self, weekly: Dict[int, tuple], overrides: Dict[date, tuple], valid_from: date,
+                 version: tuple, checked_at: float):
+        self.weekly = weekly
+        self.overrides = overrides
+        self.valid_from = valid_from
+        self.version = version
+        self.checked_at = checked_at
+
+    def covers(self, day: date) -> bool:
+        return day >= self.valid_from
+
+    def resolve(self, day: date) -> Tuple[time, time, int, int]:
+        return self.overrides.get(day) or self.weekly.get(day.weekday(), NO_SCHEDULE)
+
+
+class ScheduleStore:
+    """Снимки расписаний по организациям с LRU-ограничением числа организаций"""
+
+    def __init__(self, max_organizations: int = 10000, version_check_interval: float = 60.0,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.max_organizations = max_organizations
+        self.version_check_interval = version_check_interval
+        self._clock = clock
+        self._snapshots: "OrderedDict[int, ScheduleSnapshot]" = OrderedDict()
+
+    async def snapshot(self, db: AsyncSession, organization_id: int) -> ScheduleSnapshot:
+        snapshot = self._snapshots.get(organization_id)
+        now = self._clock()
+        if snapshot is not None and now - snapshot.checked_at >= self.version_check_interval:
+            if await self._version(db, organization_id, snapshot.valid_from) == snapshot.version:
+                snapshot.checked_at = now
+            else:
+                snapshot = None
+        if snapshot is None:
+            snapshot = await self._load(db, organization_id)
+        self._snapshots[organization_id] = snapshot
+        self._snapshots.move_to_end(organization_id)
+        while len(self._snapshots) > self.max_organizations:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, organization_id: int = None):
+        """Сбрасывает снимок организации или, если она не задана, все снимки"""
+        if organization_id is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(organization_id, None)
+
+    async def _version(self, db: AsyncSession, organization_id: int, valid_from: date) -> tuple:
+        schedules = select(func.max(Schedule.updated_at), func.count(Schedule.id)).where(
+            Schedule.organization_id == organization_id
+        ).subquery()
+        specific_dates = select(func.max(SpecificDate.id), func.count(SpecificDate.id)).where(
+            SpecificDate.organization_id == organization_id,
+            SpecificDate.date >= valid_from
+        ).subquery()
+        # Обе выборки - одна строка агрегатов, поэтому соединяем без условия
+        result = await db.execute(select(schedules, specific_dates).select_from(schedules.join(specific_dates, true())))
+        return tuple(result.one())
+
+    async def _load(self, db: AsyncSession, organization_id: int) -> ScheduleSnapshot:
+        # День назад - запас на разницу часовых поясов сервера и клиентов
+        valid_from = date.today() - timedelta(days=1)
+        # Колонки, а не сущности: строки из identity map сессии могли устареть
+        schedules = await db.execute(
+            select(
+                Schedule.day_of_week, Schedule.is_active, Schedule.updated_at, Schedule.start_time,
+                Schedule.end_time, Schedule.max_sessions_per_day, Schedule.session_duration
+            ).where(Schedule.organization_id == organization_id)
+        )
+        schedule_items = schedules.all()
+        weekly = {}
+        for schedule_item in schedule_items:
+            if schedule_item.is_active:
+                weekly.setdefault(schedule_item.day_of_week, resolve_schedule(None, schedule_item))
+        specific_dates = await db.execute(
+            select(
+                SpecificDate.id, SpecificDate.date, SpecificDate.start_time,
+                SpecificDate.end_time, SpecificDate.max_sessions_per_day
+            ).where(
+                SpecificDate.organization_id == organization_id,
+                SpecificDate.date >= valid_from
+            )
+        )
+        specific_items = specific_dates.all()
+        overrides = {}
+        for specific in specific_items:
+            overrides.setdefault(specific.date, resolve_schedule(specific, None))
+        # Версия в том же виде, что возвращает _version
+        version = (
+            max((item.updated_at for item in schedule_items if item.updated_at), default=None),
+            len(schedule_items),
+            max((item.id for item in specific_items), default=None),
+            len(specific_items),
+        )
+        return ScheduleSnapshot(weekly, overrides, valid_from, version, self._clock())
+
+
+schedule_store = ScheduleStore(
+    max_organizations=int(os.getenv('SCHEDULE_STORE_SIZE', '10000')),
+    version_check_interval=float(os.getenv('SCHEDULE_VERSION_CHECK_INTERVAL', '60'))
+)
@@ -0,0 +1,230 @@
+"""
+Движок слотов "без окон", не зависящий от хранилища.
+Алгоритм считается здесь один раз для всех точек входа (бот на SQLAlchemy,
+консольная версия на JSON, демо-скрипты); расписание и брони движок получает
+через SlotRepository, реализации которого живут рядом со своим хранилищем.
+Модуль не импортирует SQLAlchemy и aiogram, поэтому доступен и упрощённым версиям бота
+"""
+from abc import ABC, abstractmethod
+from datetime import date, time
+from itertools import combinations
+from typing import Dict, Iterable, List, Tuple
+from utils.availability_cache import DayAvailability
+from utils.slot_mask import (
+    DayGrid, WINDOW_GAP_SECONDS, find_safe_points, safe_slots_mask, time_to_seconds
+)
+
+
+def generate_time_slots(start_time: time, end_time: time, duration_minutes: int = 60) -> List[time]:
+    """
+    Генерирует список временных слотов между start_time и end_time с заданной длительностью
+    """
+    return DayGrid(start_time, end_time, duration_minutes).to_times()
+
+
+def has_window_in_combination(combination: List[time]) -> bool:
+    """
+    Проверяет, есть ли "окно" в комбинации слотов
+    Окно - это пропущенный слот между первым и последним в комбинации
+    """
+    if len(combination) <= 1:
+        return False
+
+    times_in_order = sorted(time_to_seconds(slot) for slot in combination)
+
+    # Если разница больше чем длительность одного слота (60 минут), значит есть "окно"
+    for current_time, next_time in zip(times_in_order, times_in_order[1:]):
+        if next_time - current_time > WINDOW_GAP_SECONDS:
+            return True
+
+    return False
+
+
+def get_valid_combinations(available_slots: List[time], max_sessions: int,
+                          booked_slots: List[time] = None) -> List[List[time]]:
+    """
+    Возвращает все допустимые комбинации слотов без "окон"
+    """
+    if booked_slots is None:
+        booked_slots = []
+
+    valid_combinations = []
+
+    # Сначала добавим уже забронированные слоты ко всем комбинациям
+    available_for_selection = [slot for slot in available_slots if slot not in booked_slots]
+
+    # Генерация всех возможных комбинаций
+    remaining_slots_needed = max_sessions - len(booked_slots)
+
+    if remaining_slots_needed <= 0:
+        return [booked_slots] if booked_slots else [[]]
+
+    for r in range(1, remaining_slots_needed + 1):
+        for combo in combinations(available_for_selection, r):
+            full_combo = sorted(list(booked_slots + list(combo)))
+            if not has_window_in_combination(full_combo):
+                valid_combinations.append(full_combo)
+
+    return valid_combinations
+
+
+def get_available_slots_no_windows_reference(available_slots: List[time], max_sessions: int,
+                                             booked_slots: List[time] = None) -> List[time]:
+    """
+    Эталонная (переборная) реализация get_available_slots_no_windows.
+    Перебирает все комбинации через get_valid_combinations, поэтому работает
+    экспоненциально долго; используется только для сверки результатов в тестах
+    """
+    if booked_slots is None:
+        booked_slots = []
+
+    if len(booked_slots) >= max_sessions:
+        return []
+
+    available_for_selection = [slot for slot in available_slots if slot not in booked_slots]
+
+    remaining_slots_needed = max_sessions - len(booked_slots)
+
+    if remaining_slots_needed <= 0:
+        return []
+
+    # Проверяем каждый доступный слот - может ли его выбор привести к комбинации без окон
+    safe_slots = []
+
+    for slot in available_for_selection:
+        # Создаем временную комбинацию с этим слотом
+        temp_booked = booked_slots + [slot]
+
+        # Находим все возможные комбинации с этим слотом
+        valid_combos = get_valid_combinations(available_slots, max_sessions, temp_booked)
+
+        # Если существуют комбинации без окон, которые включают этот слот, добавляем его
+        if valid_combos:
+            # Проверяем, есть ли хотя бы одна комбинация, включающая этот слот
+            slot_used = False
+            for combo in valid_combos:
+                if slot in combo:
+                    slot_used = True
+                    break
+            if slot_used:
+                safe_slots.append(slot)
+
+    return safe_slots
+
+
+def _get_available_slots_interval(available_slots: List[time], max_sessions: int,
+                                  booked_slots: List[time]) -> List[time]:
+    """
+    Интервальный алгоритм "без окон" (см. find_safe_points) над списками time
+    """
+    booked_set = set(booked_slots)
+    available_for_selection = [slot for slot in available_slots if slot not in booked_set]
+    safe = find_safe_points(
+        (time_to_seconds(slot) for slot in available_for_selection),
+        (time_to_seconds(slot) for slot in booked_slots),
+        len(booked_slots), max_sessions, WINDOW_GAP_SECONDS
+    )
+    return [slot for slot in available_for_selection if time_to_seconds(slot) in safe]
+
+
+def get_available_slots_no_windows(available_slots: List[time], max_sessions: int,
+                                   booked_slots: List[time] = None,
+                                   use_reference: bool = False) -> List[time]:
+    """
+    Возвращает список слотов, которые можно безопасно выбрать без риска создания "окна"
+    use_reference=True включает эталонный переборный алгоритм (для сверки в тестах)
+    """
+    if booked_slots is None:
+        booked_slots = []
+
+    if use_reference:
+        return get_available_slots_no_windows_reference(available_slots, max_sessions, booked_slots)
+
+    if len(booked_slots) >= max_sessions:
+        return []
+
+    return _get_available_slots_interval(available_slots, max_sessions, booked_slots)
+
+
+def get_available_slots_for_day(start_time: time, end_time: time, max_sessions: int,
+                                session_duration: int = 60, booked_slots: List[time] = None,
+                                blocked_slots: List[time] = None) -> List[time]:
+    """
+    Безопасные слоты дня по расписанию, посчитанные на битовых масках.
+    Совпадает с get_available_slots_no_windows(generate_time_slots(...), ...),
+    если занятые слоты лежат на сетке расписания; иначе считает по спискам time
+    """
+    if booked_slots is None:
+        booked_slots = []
+    grid = DayGrid(start_time, end_time, session_duration)
+    booked_mask, off_grid = grid.to_mask(booked_slots)
+    if off_grid:
+        blocked = set(blocked_slots or [])
+        available_slots = [slot for slot in grid.to_times() if slot not in blocked]
+        return get_available_slots_no_windows(available_slots, max_sessions, booked_slots)
+    blocked_mask, _ = grid.to_mask(blocked_slots or [])
+    free_mask = grid.full_mask & ~blocked_mask & ~booked_mask
+    safe_mask = safe_slots_mask(free_mask, booked_mask, max_sessions, len(booked_slots), grid.max_step)
+    return grid.to_times(safe_mask)
+
+
+def build_day_availability(schedule: Tuple[time, time, int, int], booked_slots: List[time]) -> DayAvailability:
+    """Доступность дня по расписанию (start_time, end_time, max_sessions, session_duration) и броням"""
+    start_time, end_time, max_sessions, session_duration = schedule
+    if start_time is None:
+        return DayAvailability(None, None, None, None, [])
+    return DayAvailability(
+        start_time, end_time, max_sessions, session_duration,
+        get_available_slots_for_day(start_time, end_time, max_sessions, session_duration, booked_slots)
+    )
+
+
+class SlotRepository(ABC):
+    """
+    Источник данных движка: действующее расписание организации на дату и времена
+    начала активных броней. Реализации: SqlSlotRepository (utils.booking_algorithm)
+    и JsonSlotRepository (simple_bot_demo)
+    """
+
+    @abstractmethod
+    async def get_schedule(self, organization_id, day: date) -> Tuple[time, time, int, int]:
+        """(start_time, end_time, max_sessions_per_day, session_duration); без расписания start_time - None"""
+
+    @abstractmethod
+    async def get_booked_slots(self, organization_id, day: date) -> List[time]:
+        """Времена начала активных броней на дату"""
+
+    async def get_booked_slots_range(self, organization_id, start_date: date,
+                                     end_date: date) -> Dict[date, List[time]]:
+        """
+        Брони за диапазон дат по дням. По умолчанию - get_booked_slots на каждый день;
+        хранилища, умеющие выбрать диапазон разом, переопределяют метод
+        """
+        result = {}
+        day = start_date
+        while day <= end_date:
+            result[day] = await self.get_booked_slots(organization_id, day)
+            day = date.fromordinal(day.toordinal() + 1)
+        return result
+
+
+async def compute_day_availability(repository: SlotRepository, organization_id, day: date) -> DayAvailability:
+    """Расписание и безопасные слоты организации на дату"""
+    schedule = await repository.get_schedule(organization_id, day)
+    if schedule[0] is None:
+        return build_day_availability(schedule, [])
+    return build_day_availability(schedule, await repository.get_booked_slots(organization_id, day))
+
+
+async def compute_availability(repository: SlotRepository, organization_id,
+                               days: Iterable[date]) -> Dict[date, DayAvailability]:
+    """Доступность на несколько дат: брони выбираются одним обращением за весь диапазон"""
+    days = sorted(set(days))
+    if not days:
+        return {}
+    booked_by_day = await repository.get_booked_slots_range(organization_id, days[0], days[-1])
+    result = {}
+    for day in days:
+        schedule = await repository.get_schedule(organization_id, day)
+        result[day] = build_day_availability(schedule, booked_by_day.get(day, []))
+    return result
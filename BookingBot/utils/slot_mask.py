@@ -0,0 +1,282 @@
+"""
+Компактное представление рабочего дня для алгоритма "без окон".
+Слоты дня нумеруются порядковыми номерами (0 - первый слот), а наборы слотов
+хранятся как целочисленные битовые маски: бит i установлен, если слот i входит в набор.
+Преобразование в списки time выполняется только на границах (БД, клавиатуры)
+"""
+from bisect import bisect_left, bisect_right
+from datetime import time
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+# Максимально допустимый промежуток между соседними слотами комбинации
+# (порог 60 минут из has_window_in_combination)
+WINDOW_GAP_SECONDS = 60 * 60
+
+
+def time_to_seconds(value: time) -> int:
+    """Секунды от начала суток (микросекунды не учитываются)"""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def seconds_to_time(value: int) -> time:
+    return time(value // 3600, value % 3600 // 60, value % 60)
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Порядковые номера установленных битов по возрастанию"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DayGrid:
+    """
+    Сетка слотов одного дня: слот i начинается в start_time + i * duration_minutes
+    """
+    __slots__ = ("start_seconds", "step_seconds", "size", "full_mask")
+
+    def __init__(self, start_time: time, end_time: time, duration_minutes: int = 60):
+        self.start_seconds = time_to_seconds(start_time)
+        self.step_seconds = duration_minutes * 60
+        self.size = max(0, (time_to_seconds(end_time) - self.start_seconds) // self.step_seconds)
+        self.full_mask = (1 << self.size) - 1
+
+    @property
+    def max_step(self) -> int:
+        """Максимальное расстояние (в слотах) между соседними слотами комбинации без окон"""
+        return WINDOW_GAP_SECONDS // self.step_seconds
+
+    def ordinal(self, value: time) -> Optional[int]:
+        """Порядковый номер слота или None, если время не лежит на сетке"""
+        offset = time_to_seconds(value) - self.start_seconds
+        if offset < 0 or offset % self.step_seconds or value.microsecond:
+            return None
+        index = offset // self.step_seconds
+        return index if index < self.size else None
+
+    def slot_time(self, ordinal: int) -> time:
+        return seconds_to_time(self.start_seconds + ordinal * self.step_seconds)
+
+    def to_mask(self, times: Iterable[time]) -> Tuple[int, List[time]]:
+        """
+        Переводит список времени в маску
+        Возвращает: (маска, список времени вне сетки)
+        """
+        mask = 0
+        off_grid = []
+        for value in times:
+            index = self.ordinal(value)
+            if index is None:
+                off_grid.append(value)
+            else:
+                mask |= 1 << index
+        return mask, off_grid
+
+    def to_times(self, mask: Optional[int] = None) -> List[time]:
+        """Переводит маску в список времени (по умолчанию - все слоты дня)"""
+        if mask is None:
+            mask = self.full_mask
+        return [self.slot_time(index) for index in iter_bits(mask & self.full_mask)]
+
+
+def mask_has_window(mask: int, max_step: int = 1) -> bool:
+    """
+    Проверяет, есть ли "окно" в наборе слотов, заданном маской:
+    два соседних выбранных слота дальше друг от друга, чем на max_step
+    """
+    if mask & (mask - 1) == 0:  # не больше одного слота
+        return False
+    if max_step <= 0:
+        return True
+    mask >>= (mask & -mask).bit_length() - 1
+    # Пропуски внутри набора; окно - это серия из max_step пропусков подряд
+    gaps = ~mask & ((1 << mask.bit_length()) - 1)
+    run = gaps
+    for _ in range(max_step - 1):
+        run &= run >> 1
+    return run != 0
+
+
+def _fill_costs(points: List[int], anchors: List[bool], max_gap: int, forward: bool) -> List[float]:
+    """
+    Для каждой точки считает минимальное число промежуточных свободных точек,
+    нужных, чтобы без окон дойти до ближайшей занятой точки справа (forward=True)
+    или слева (forward=False).
+    Жадный шаг на самую дальнюю точку в пределах max_gap оптимален,
+    а указатель на неё монотонен, поэтому весь проход занимает O(n)
+    """
+    n = len(points)
+    costs = [float("inf")] * n
+    order = range(n - 1, -1, -1) if forward else range(n)
+    sign = 1 if forward else -1
+    anchor = None  # индекс ближайшей занятой точки по направлению
+    far = None  # индекс самой дальней точки в пределах max_gap
+    for i in order:
+        if anchors[i]:
+            anchor = i
+            far = i
+            continue
+        if anchor is None:
+            continue
+        if sign * (points[anchor] - points[i]) <= max_gap:
+            costs[i] = 0
+            continue
+        while sign * (points[far] - points[i]) > max_gap:
+            far -= sign
+        if far != i:
+            costs[i] = costs[far] + 1
+    return costs
+
+
+def find_safe_points(free_points: Iterable[int], booked_points: Iterable[int], booked_count: int,
+                     max_sessions: int, max_gap: int) -> Set[int]:
+    """
+    Интервальный алгоритм "без окон" за O(n log n) над целочисленными точками
+    (секундами или порядковыми номерами слотов).
+    Точка s безопасна, если занятые точки + s можно дополнить непустым набором
+    свободных точек (не больше оставшейся вместимости) до набора без окон.
+    Минимальное число дополнений - сумма по промежуткам между соседними занятыми
+    точками, поэтому для каждой s пересчитывается только промежуток, в который она попадает
+    """
+    booked_times = sorted(set(booked_points))
+    booked_set = set(booked_times)
+    free_times = sorted(set(free_points) - booked_set)
+    remaining_after_slot = max_sessions - booked_count - 1
+
+    if booked_count >= max_sessions:
+        return set()
+    # Точка, добивающая лимит: эталонный алгоритм не проверяет для неё окна
+    if remaining_after_slot <= 0:
+        return set(free_times)
+
+    points = sorted(free_times + booked_times)
+    position = {value: index for index, value in enumerate(points)}
+    anchors = [value in booked_set for value in points]
+    to_right = _fill_costs(points, anchors, max_gap, forward=True)
+    to_left = _fill_costs(points, anchors, max_gap, forward=False)
+
+    # Стоимость заполнения каждого промежутка между соседними занятыми точками
+    gap_costs = []
+    for left, right in zip(booked_times, booked_times[1:]):
+        if right - left <= max_gap:
+            gap_costs.append(0)
+            continue
+        far = bisect_right(points, left + max_gap) - 1
+        gap_costs.append(to_right[far] + 1 if far != position[left] else float("inf"))
+    infinite_gaps = sum(1 for cost in gap_costs if cost == float("inf"))
+    finite_total = sum(cost for cost in gap_costs if cost != float("inf"))
+
+    safe = set()
+    for value in free_times:
+        index = bisect_left(booked_times, value)
+        new_costs = []
+        inf_count = infinite_gaps
+        total = finite_total
+        if 0 < index < len(booked_times):
+            # Точка делит промежуток на два: убираем стоимость старого
+            old_cost = gap_costs[index - 1]
+            if old_cost == float("inf"):
+                inf_count -= 1
+            else:
+                total -= old_cost
+        if index > 0:
+            new_costs.append(to_left[position[value]])
+        if index < len(booked_times):
+            new_costs.append(to_right[position[value]])
+        for cost in new_costs:
+            if cost == float("inf"):
+                inf_count += 1
+            else:
+                total += cost
+
+        if inf_count:
+            continue
+        if total > 0:
+            if total <= remaining_after_slot:
+                safe.add(value)
+            continue
+        # Набор уже без окон: нужна хотя бы одна свободная точка вплотную к блоку
+        low = min(value, booked_times[0]) if booked_times else value
+        high = max(value, booked_times[-1]) if booked_times else value
+        neighbours = bisect_right(free_times, high + max_gap) - bisect_left(free_times, low - max_gap)
+        if neighbours > 1:  # сама точка тоже попадает в диапазон
+            safe.add(value)
+    return safe
+
+
+def _run_below(free_mask: int, index: int) -> int:
+    """Маска непрерывной серии свободных слотов, заканчивающейся на index - 1"""
+    below = free_mask & ((1 << index) - 1)
+    holes = ~below & ((1 << index) - 1)
+    return below & ~((1 << holes.bit_length()) - 1)
+
+
+def _run_above(free_mask: int, index: int) -> int:
+    """Маска непрерывной серии свободных слотов, начинающейся с index + 1"""
+    above = free_mask >> (index + 1)
+    run = above & ~(above + 1)  # младшая серия единиц
+    return run << (index + 1)
+
+
+def safe_slots_mask(free_mask: int, booked_mask: int, max_sessions: int,
+                    booked_count: Optional[int] = None, max_step: int = 1) -> int:
+    """
+    Маска слотов, которые можно безопасно выбрать без риска создания "окна".
+    free_mask - свободные слоты (без занятых и заблокированных), booked_mask - занятые.
+    booked_count - число броней с учётом дублей (по умолчанию - число битов booked_mask)
+    """
+    free_mask &= ~booked_mask
+    if booked_count is None:
+        booked_count = bin(booked_mask).count("1")
+    remaining_after_slot = max_sessions - booked_count - 1
+    if booked_count >= max_sessions:
+        return 0
+    if remaining_after_slot <= 0:
+        return free_mask
+
+    if max_step != 1:
+        safe = find_safe_points(iter_bits(free_mask), iter_bits(booked_mask),
+                                booked_count, max_sessions, max_step)
+        return sum(1 << index for index in safe)
+
+    if not booked_mask:
+        # Слот безопасен, если рядом есть ещё один свободный слот
+        return free_mask & ((free_mask << 1) | (free_mask >> 1))
+
+    low = (booked_mask & -booked_mask).bit_length() - 1
+    high = booked_mask.bit_length() - 1
+    span = ((1 << (high + 1)) - 1) & ~((1 << low) - 1)
+    if span & ~(free_mask | booked_mask):
+        return 0  # внутри блока есть заблокированный слот
+    inside = free_mask & span
+    need_inside = bin(inside).count("1")
+    # Сколько слотов можно добавить снаружи блока после заполнения пропусков
+    spare = remaining_after_slot - need_inside
+
+    safe = 0
+    if need_inside:
+        # Слот внутри блока сам закрывает один пропуск
+        if need_inside - 1 <= remaining_after_slot:
+            safe |= inside
+            if need_inside == 1 and not (free_mask >> (high + 1)) & 1 and not (low and (free_mask >> (low - 1)) & 1):
+                safe &= ~inside  # единственный пропуск, а рядом с блоком свободных слотов нет
+    if spare + 1 <= 0:
+        return safe
+
+    below = _run_below(free_mask, low)
+    above = _run_above(free_mask, high)
+    limit = spare + 1  # насколько далеко от блока можно выбрать слот
+    below &= ~((1 << max(0, low - limit)) - 1)
+    above &= (1 << (high + 1 + limit)) - 1
+    safe |= below | above
+
+    if not need_inside:
+        # Соседний с блоком слот без других дополнений: нужен ещё один свободный рядом
+        adjacent_below = (1 << (low - 1)) if low else 0
+        adjacent_above = 1 << (high + 1)
+        if adjacent_below & below and not ((below << 1) & adjacent_below or above & adjacent_above):
+            safe &= ~adjacent_below
+        if adjacent_above & above and not ((above >> 1) & adjacent_above or below & adjacent_below):
+            safe &= ~adjacent_above
+    return safe
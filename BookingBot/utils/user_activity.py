@@ -0,0 +1,97 @@
+"""
+Отложенная запись времени последнего взаимодействия пользователей.
+Обновления last_interaction_at копятся в памяти и раз в несколько секунд
+записываются в БД одним пакетным UPDATE, а не коммитом на каждое сообщение
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import bindparam, update
+from database.models import User
+
+
+class InteractionBuffer:
+    """Буфер отметок активности: telegram_id -> время последнего взаимодействия"""
+
+    def __init__(self, flush_interval: float = 5.0, known_users_limit: int = 100000):
+        self.flush_interval = flush_interval
+        self.known_users_limit = known_users_limit
+        self._pending: Dict[int, datetime] = {}
+        # Пользователи, про которых известно, что строка в users уже есть
+        self._known_users: "OrderedDict[int, None]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def is_known(self, telegram_id: int) -> bool:
+        if telegram_id in self._known_users:
+            self._known_users.move_to_end(telegram_id)
+            return True
+        return False
+
+    def mark_known(self, telegram_id: int):
+        self._known_users[telegram_id] = None
+        self._known_users.move_to_end(telegram_id)
+        while len(self._known_users) > self.known_users_limit:
+            self._known_users.popitem(last=False)
+
+    def touch(self, telegram_id: int, when: datetime = None):
+        self._pending[telegram_id] = when or datetime.utcnow()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self, session_factory) -> int:
+        """Записывает накопленные отметки одним UPDATE; возвращает число пользователей"""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        users = User.__table__
+        statement = update(users).where(users.c.telegram_id == bindparam("user_telegram_id")).values(
+            last_interaction_at=bindparam("interaction_at")
+        )
+        try:
+            async with session_factory() as db:
+                # executemany на уровне Core: один подготовленный UPDATE на весь пакет
+                connection = await db.connection()
+                await connection.execute(statement, [
+                    {"user_telegram_id": telegram_id, "interaction_at": interaction_at}
+                    for telegram_id, interaction_at in batch.items()
+                ])
+                await db.commit()
+        except Exception:
+            # Вернём отметки в буфер, не затирая более свежие
+            for telegram_id, interaction_at in batch.items():
+                self._pending.setdefault(telegram_id, interaction_at)
+            raise
+        return len(batch)
+
+    def start(self, session_factory):
+        """Запускает периодическую запись в фоне"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self, session_factory):
+        """Останавливает фоновую запись и сбрасывает остаток"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(session_factory)
+
+    async def _run(self, session_factory):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(session_factory)
+            except Exception as e:
+                print(f"Ошибка при записи активности пользователей: {e}")
+
+
+interaction_buffer = InteractionBuffer(
+    flush_interval=float(os.getenv('USER_TOUCH_FLUSH_INTERVAL', '5'))
+)
@@ -0,0 +1,138 @@
+"""
+Приём апдейтов через webhook: aiohttp-приложение для работы за балансировщиком.
+Telegram получает ответ 200 сразу, апдейт обрабатывается в фоне;
+одновременно обрабатывается не больше WEBHOOK_MAX_CONCURRENT_UPDATES апдейтов,
+при заполнении лимита новые запросы ждут свободного места (Telegram притормаживает отправку)
+"""
+import asyncio
+import os
+from typing import Any, Dict, NamedTuple, Optional, Set
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+
+class WebhookSettings(NamedTuple):
+    """Параметры webhook-сервера"""
+    base_url: str  # публичный адрес, например https://bot.example.com
+    path: str = "/webhook"
+    secret_token: Optional[str] = None  # сверяется с заголовком X-Telegram-Bot-Api-Secret-Token
+    host: str = "0.0.0.0"
+    port: int = 8080
+    max_concurrent_updates: int = 100
+    set_webhook_on_startup: bool = True  # при нескольких экземплярах достаточно одного
+
+    @property
+    def url(self) -> str:
+        return self.base_url.rstrip("/") + self.path
+
+
+def load_webhook_settings(environ=None) -> WebhookSettings:
+    """Настройки webhook из переменных окружения WEBHOOK_* и WEBAPP_*"""
+    if environ is None:
+        environ = os.environ
+    base_url = environ.get('WEBHOOK_BASE_URL')
+    if not base_url:
+        raise ValueError("Для режима webhook необходимо установить WEBHOOK_BASE_URL")
+    path = environ.get('WEBHOOK_PATH') or WebhookSettings._field_defaults["path"]
+    if not path.startswith("/"):
+        path = "/" + path
+    return WebhookSettings(
+        base_url=base_url,
+        path=path,
+        secret_token=environ.get('WEBHOOK_SECRET') or None,
+        host=environ.get('WEBAPP_HOST') or WebhookSettings._field_defaults["host"],
+        port=int(environ.get('WEBAPP_PORT') or WebhookSettings._field_defaults["port"]),
+        max_concurrent_updates=int(environ.get('WEBHOOK_MAX_CONCURRENT_UPDATES') or
+                                   WebhookSettings._field_defaults["max_concurrent_updates"]),
+        set_webhook_on_startup=environ.get('WEBHOOK_SET_ON_STARTUP', 'true').strip().lower() in ("1", "true", "yes", "on"),
+    )
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Фоновая обработка апдейтов с ограничением числа одновременно выполняемых.
+    Переопределён только публичный handle: проверку секрета, разбор апдейта
+    и запуск фоновой задачи класс делает сам, без приватных методов aiogram
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrent_updates: int = 100,
+                 secret_token: Optional[str] = None, **data: Any):
+        super().__init__(dispatcher, bot, handle_in_background=False, secret_token=secret_token, **data)
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            return web.Response(body="Unauthorized", status=401)
+        update = await request.json(loads=bot.session.json_loads)
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process_update(bot, update))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_update_done)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def _process_update(self, bot: Bot, update: Dict[str, Any]):
+        result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+        if isinstance(result, TelegramMethod):
+            # Ответ методом в теле webhook невозможен - ответ уже отправлен
+            await self.dispatcher.silent_call_request(bot=bot, result=result)
+
+    def _on_update_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Ошибка при обработке апдейта: {task.exception()}")
+
+    async def close(self):
+        """Дожидается апдейтов в обработке и закрывает сессию бота"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await super().close()
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, settings: WebhookSettings) -> web.Application:
+    """aiohttp-приложение с маршрутом webhook и проверкой доступности для балансировщика"""
+    app = web.Application()
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_concurrent_updates=settings.max_concurrent_updates,
+        secret_token=settings.secret_token,
+    ).register(app, path=settings.path)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app.router.add_get("/health", health)
+
+    if settings.set_webhook_on_startup:
+        async def set_webhook(app: web.Application):
+            await bot.set_webhook(
+                settings.url,
+                secret_token=settings.secret_token,
+                max_connections=min(settings.max_concurrent_updates, 100),
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        app.on_startup.append(set_webhook)
+
+    # Связывает запуск/остановку приложения с dp.startup/dp.shutdown
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings: WebhookSettings):
+    """Запускает webhook-сервер и работает до отмены"""
+    app = create_webhook_app(dp, bot, settings)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.host, port=settings.port)
+    await site.start()
+    print(f"Webhook-сервер слушает {settings.host}:{settings.port}{settings.path}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Дожидается апдейтов в обработке, затем вызывает dp.shutdown (там закрываются пулы БД)
+        await runner.cleanup()